@@ -0,0 +1,166 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- DAILY AGGREGATE STORE ---
+# One row per (user, day) holding that day's income/expense sums and row counts.
+# Everything calculate_metrics needs (balance, weekly burn windows, monthly income
+# series, 30-day momentum windows) can be derived from these buckets, so the budget
+# path reads O(days) rows instead of O(transactions).
+
+DAILY_TOTALS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS daily_totals (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        income REAL NOT NULL DEFAULT 0,
+        expense REAL NOT NULL DEFAULT 0,
+        income_count INTEGER NOT NULL DEFAULT 0,
+        expense_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    )
+'''
+
+UPSERT_DAILY_TOTALS = '''
+    INSERT INTO daily_totals (user_id, day, income, expense, income_count, expense_count)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, day) DO UPDATE SET
+        income = income + excluded.income,
+        expense = expense + excluded.expense,
+        income_count = income_count + excluded.income_count,
+        expense_count = expense_count + excluded.expense_count
+'''
+
+
+def init_daily_totals(cursor) -> None:
+    """Create the aggregate table, backfilling it from existing transactions on first run."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_totals'")
+    exists = cursor.fetchone() is not None
+    cursor.execute(DAILY_TOTALS_SCHEMA)
+    if not exists:
+        rebuild_daily_totals(cursor)
+        logger.info("Backfilled daily_totals from existing transactions.")
+
+
+def rebuild_daily_totals(cursor, user_id: Optional[str] = None) -> None:
+    """
+    Recompute buckets from the transactions table (all users, or a single user). Rows
+    moved to the archive tier (archive.py) are read back from its Parquet parts, so
+    archived days keep their buckets and balances do not change. Raises
+    ArchiveUnavailable before touching anything if archived users are in scope and
+    pyarrow is missing.
+    """
+    where = "WHERE user_id = ?" if user_id else ""
+    params: Tuple = (user_id,) if user_id else ()
+
+    archived_users = []
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archive_parts'")
+    if cursor.fetchone() is not None:
+        cursor.execute(f"SELECT DISTINCT user_id FROM archive_parts {where}", params)
+        archived_users = [r[0] for r in cursor.fetchall()]
+    if archived_users:
+        from archive import archived_daily_totals, require_pyarrow   # archive imports this module
+        require_pyarrow()
+
+    cursor.execute(f"DELETE FROM daily_totals {where}", params)
+    cursor.execute(f'''
+        INSERT INTO daily_totals (user_id, day, income, expense, income_count, expense_count)
+        SELECT
+            user_id,
+            date,
+            COALESCE(SUM(CASE WHEN type = 'Income' THEN amount END), 0),
+            COALESCE(SUM(CASE WHEN type = 'Expense' THEN amount END), 0),
+            SUM(type = 'Income'),
+            SUM(type = 'Expense')
+        FROM transactions
+        {where}
+        GROUP BY user_id, date
+    ''', params)
+    for archived_user in archived_users:
+        cursor.executemany(UPSERT_DAILY_TOTALS, archived_daily_totals(cursor, archived_user))
+
+
+def record_transactions(cursor, rows: Iterable[Tuple]) -> None:
+    """
+    Fold freshly inserted rows into the daily buckets.
+
+    `rows` uses the transactions INSERT tuple layout:
+    (date, type, category, amount, description, user_id). Must run inside the same
+    transaction as the INSERT so the buckets never drift from the raw rows.
+    """
+    buckets = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    for date_str, trans_type, _category, amount, _description, user_id in rows:
+        bucket = buckets[(user_id, date_str)]
+        if trans_type == "Income":
+            bucket[0] += amount
+            bucket[2] += 1
+        elif trans_type == "Expense":
+            bucket[1] += amount
+            bucket[3] += 1
+
+    cursor.executemany(
+        UPSERT_DAILY_TOTALS,
+        [(user_id, day, *totals) for (user_id, day), totals in buckets.items()]
+    )
+
+    # Snapshots cover the 180 days up to their own date, so every snapshot on or
+    # after the earliest day touched is now stale.
+    earliest = {}
+    for user_id, day in buckets:
+        if user_id not in earliest or day < earliest[user_id]:
+            earliest[user_id] = day
+    cursor.executemany(
+        "DELETE FROM metric_snapshots WHERE user_id = ? AND day >= ?",
+        list(earliest.items())
+    )
+
+
+def fetch_daily_totals(cursor, user_id: str, since: str) -> List[dict]:
+    cursor.execute(
+        "SELECT day, income, expense, income_count, expense_count FROM daily_totals "
+        "WHERE user_id = ? AND day >= ? ORDER BY day",
+        (user_id, since)
+    )
+    return [dict(r) for r in cursor.fetchall()]
+
+
+# --- ARRAY VIEW ---
+EPOCH = datetime(1970, 1, 1)
+
+def day_number(moment: datetime) -> float:
+    """Days since 1970-01-01 as a float, so "on or after `moment`" compares exactly against whole days."""
+    return (moment - EPOCH).total_seconds() / 86400
+
+
+class DailyArrays(NamedTuple):
+    """A user's daily buckets as parallel columns, ordered by day (int days since 1970-01-01)."""
+    days: np.ndarray
+    income: np.ndarray
+    expense: np.ndarray
+    income_count: np.ndarray
+    expense_count: np.ndarray
+
+    def since(self, day: float) -> "DailyArrays":
+        start = int(np.searchsorted(self.days, day, side="left"))
+        return DailyArrays(*(column[start:] for column in self))
+
+
+def fetch_daily_arrays(cursor, user_id: str, since: str) -> DailyArrays:
+    """fetch_daily_totals, but with SQLite converting days to integers and the rows landing in NumPy columns."""
+    cursor.execute(
+        "SELECT CAST(julianday(day) - 2440587.5 AS INTEGER), income, expense, income_count, expense_count "
+        "FROM daily_totals WHERE user_id = ? AND day >= ? ORDER BY day",
+        (user_id, since)
+    )
+    table = np.array([tuple(r) for r in cursor.fetchall()], dtype=np.float64).reshape(-1, 5)
+    return DailyArrays(
+        table[:, 0].astype(np.int64),
+        table[:, 1].copy(),
+        table[:, 2].copy(),
+        table[:, 3].astype(np.int64),
+        table[:, 4].astype(np.int64),
+    )
@@ -0,0 +1,397 @@
+"""
+Archive tier for old transactions.
+
+Rows older than ARCHIVE_AFTER_DAYS are moved out of SQLite into compressed per-user
+Parquet files under ARCHIVE_DIR. daily_totals keeps their buckets, so balances and
+metrics are unchanged; the hot table and its indexes only hold recent history.
+Run it nightly (cron, or any scheduler):
+
+    python archive.py                      # archive every user
+    python archive.py --user u1 --days 365
+
+Requires pyarrow (optional: without it nothing is archived and GET /export answers 501).
+"""
+import os
+import io
+import time
+import uuid
+import hashlib
+import sqlite3
+import logging
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from database import DB_FILE, get_db_connection
+from dedup import normalize_description
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+API_WINDOW_DAYS = 180          # longest raw-transaction window the API reads (consistency, goals)
+ARCHIVE_AFTER_DAYS = max(int(os.getenv("ARCHIVE_AFTER_DAYS", "200")), API_WINDOW_DAYS + 1)
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_MAX_PARTS = 8           # parts per user before they are compacted into one
+ARCHIVE_ROW_GROUP_ROWS = 65536
+# Unregistered files younger than this are left alone by sweep_orphans: parts replaced
+# by a compaction may still be open in an export stream or a reader that listed them
+# before the swap, and a concurrent run's new part is not registered yet.
+ARCHIVE_GRACE_SECONDS = float(os.getenv("ARCHIVE_GRACE_SECONDS", str(24 * 3600)))
+EXPORT_BATCH_ROWS = 50000
+
+COLUMNS = ("id", "date", "type", "category", "amount", "description", "user_id")
+
+
+class ArchiveUnavailable(Exception):
+    pass
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ArchiveUnavailable("The archive tier needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def archive_schema():
+    pa = require_pyarrow()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("type", pa.string()),
+        ("category", pa.string()),
+        ("amount", pa.float64()),
+        ("description", pa.string()),
+        ("user_id", pa.string()),
+    ])
+
+
+def rows_to_batch(rows: Sequence[Tuple]):
+    """transactions rows (SELECT * column order) as one Arrow RecordBatch."""
+    pa = require_pyarrow()
+    schema = archive_schema()
+    columns = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+    arrays = [pa.array(values, type=pa.string() if field.name == "date" else field.type)
+              for values, field in zip(columns, schema)]
+    arrays[1] = arrays[1].cast(pa.date32())
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def user_dir(user_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, hashlib.sha256(user_id.encode()).hexdigest()[:24])
+
+
+# --- READS ---
+def archived_parts(cursor, user_id: str) -> List[str]:
+    cursor.execute("SELECT path FROM archive_parts WHERE user_id = ? ORDER BY first_date, path", (user_id,))
+    return [r[0] for r in cursor.fetchall()]
+
+
+def archived_through(cursor, user_id: str) -> Optional[str]:
+    """Latest date held in the user's archive, or None if nothing is archived."""
+    cursor.execute("SELECT MAX(last_date) FROM archive_parts WHERE user_id = ?", (user_id,))
+    return cursor.fetchone()[0]
+
+
+def iter_archive_batches(paths: Sequence[str], columns: Optional[Sequence[str]] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """
+    RecordBatches from archive parts, read through memory-mapped files. Date bounds are
+    pushed down, so row groups whose statistics fall outside them are never decoded.
+    """
+    if not paths:
+        return
+    pa = require_pyarrow()
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+
+    condition = None
+    for op, bound in (("__ge__", date_from), ("__le__", date_to)):
+        if bound:
+            term = getattr(ds.field("date"), op)(pa.scalar(date.fromisoformat(bound), pa.date32()))
+            condition = term if condition is None else condition & term
+    dataset = ds.dataset(list(paths), schema=archive_schema(), format="parquet",
+                         filesystem=LocalFileSystem(use_mmap=True))
+    yield from dataset.to_batches(columns=list(columns) if columns else None, filter=condition,
+                                  batch_size=EXPORT_BATCH_ROWS)
+
+
+def archived_daily_totals(cursor, user_id: str) -> List[Tuple]:
+    """daily_totals rows (user_id, day, income, expense, income_count, expense_count) of the user's archive."""
+    buckets: Dict[str, List] = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    for batch in iter_archive_batches(archived_parts(cursor, user_id), ("date", "type", "amount")):
+        for day, kind, amount in zip(*(batch.column(i).to_pylist() for i in range(3))):
+            bucket = buckets[day.isoformat()]
+            if kind == "Income":
+                bucket[0] += amount
+                bucket[2] += 1
+            elif kind == "Expense":
+                bucket[1] += amount
+                bucket[3] += 1
+    return [(user_id, day, *totals) for day, totals in buckets.items()]
+
+
+def find_archived_matches(cursor, user_id: str, incoming: Sequence[Tuple[str, float, str]],
+                          window_days: int) -> List[Tuple[int, int, int]]:
+    """
+    (position, archived id, day distance) for incoming (date, amount, description) rows
+    that match archived rows, with the same rules as dedup's SQL matching.
+    """
+    paths = archived_parts(cursor, user_id)
+    if not paths or not incoming:
+        return []
+    dates = [date.fromisoformat(d) for d, _, _ in incoming]
+    window = timedelta(days=window_days)
+    stored = defaultdict(list)
+    for batch in iter_archive_batches(paths, ("id", "date", "amount", "description"),
+                                      (min(dates) - window).isoformat(), (max(dates) + window).isoformat()):
+        for row_id, day, amount, description in zip(*(batch.column(i).to_pylist() for i in range(4))):
+            stored[(amount, normalize_description(description))].append((day, row_id))
+
+    matches = []
+    for pos, ((_, amount, description), day) in enumerate(zip(incoming, dates)):
+        for stored_day, row_id in stored.get((amount, normalize_description(description)), ()):
+            distance = abs((stored_day - day).days)
+            if distance <= window_days:
+                matches.append((pos, row_id, distance))
+    return matches
+
+
+# --- WRITES ---
+def _write_part(user_id: str, table) -> str:
+    """Write a Parquet part atomically (temp file + rename); returns its path."""
+    import pyarrow.parquet as pq
+
+    directory = user_dir(user_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+    pq.write_table(table, path + ".tmp", compression=ARCHIVE_COMPRESSION,
+                   row_group_size=ARCHIVE_ROW_GROUP_ROWS)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def _register_part(cursor, user_id: str, path: str, table) -> None:
+    import pyarrow.compute as pc
+
+    dates = pc.min_max(table.column("date")).as_py()
+    cursor.execute(
+        "INSERT INTO archive_parts (path, user_id, first_date, last_date, rows, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (path, user_id, dates["min"].isoformat(), dates["max"].isoformat(), table.num_rows,
+         datetime.now().isoformat(timespec="seconds"))
+    )
+
+
+def _retire_files(paths: Sequence[str]) -> None:
+    """Start the grace period of parts that were just unregistered; sweep_orphans deletes them later."""
+    for path in paths:
+        try:
+            os.utime(path)
+        except OSError as e:
+            logger.warning(f"Could not retire archive file {path}: {e}")
+
+
+def _remove_files(paths: Sequence[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove archive file {path}: {e}")
+
+
+def archive_user(conn, user_id: str, cutoff: str) -> int:
+    """
+    Move the user's transactions dated before `cutoff` into a new Parquet part.
+    The part is registered and the rows deleted in one SQLite transaction, after the
+    file is in place; a crash in between leaves an unregistered file, which
+    sweep_orphans removes. Returns the number of rows moved.
+    """
+    pa = require_pyarrow()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM transactions WHERE user_id = ? AND date < ? ORDER BY date, id", (user_id, cutoff))
+    rows = [tuple(r) for r in cursor.fetchall()]
+    if not rows:
+        return 0
+
+    table = pa.Table.from_batches([rows_to_batch(rows)])
+    path = _write_part(user_id, table)
+    try:
+        _register_part(cursor, user_id, path, table)
+        cursor.execute("DELETE FROM transactions WHERE user_id = ? AND date < ? AND id <= ?",
+                       (user_id, cutoff, max(r[0] for r in rows)))
+        if cursor.rowcount != len(rows):
+            raise RuntimeError(f"Transactions for {user_id} changed while archiving")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        _remove_files([path])
+        raise
+
+    if len(archived_parts(cursor, user_id)) > ARCHIVE_MAX_PARTS:
+        compact_user(conn, user_id)
+    return len(rows)
+
+
+def compact_user(conn, user_id: str) -> None:
+    """
+    Merge all of a user's parts into one, sorted by date. The replaced parts stay on
+    disk until a later sweep_orphans, since readers may still hold their paths.
+    """
+    pa = require_pyarrow()
+    cursor = conn.cursor()
+    paths = archived_parts(cursor, user_id)
+    if len(paths) < 2:
+        return
+
+    table = pa.Table.from_batches(list(iter_archive_batches(paths)), schema=archive_schema())
+    table = table.sort_by([("date", "ascending"), ("id", "ascending")])
+    merged = _write_part(user_id, table)
+    try:
+        cursor.execute(f"DELETE FROM archive_parts WHERE path IN ({', '.join('?' * len(paths))})", paths)
+        _register_part(cursor, user_id, merged, table)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        _remove_files([merged])
+        raise
+    _retire_files(paths)
+
+
+def sweep_orphans(conn, grace_seconds: float = ARCHIVE_GRACE_SECONDS) -> int:
+    """
+    Delete part files that no archive_parts row points at (replaced by a compaction, or
+    left by an interrupted run) once they are older than the grace period.
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0
+    registered = {r[0] for r in conn.execute("SELECT path FROM archive_parts")}
+    expired = time.time() - grace_seconds
+    orphans = []
+    for root, _, names in os.walk(ARCHIVE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            if not (name.endswith(".parquet") or name.endswith(".tmp")) or path in registered:
+                continue
+            try:
+                if os.path.getmtime(path) < expired:
+                    orphans.append(path)
+            except OSError:
+                continue   # removed by a concurrent sweep
+    _remove_files(orphans)
+    return len(orphans)
+
+
+def archive_all(days: int = ARCHIVE_AFTER_DAYS, user_id: Optional[str] = None) -> Dict:
+    require_pyarrow()
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    moved: Dict[str, int] = {}
+    with get_db_connection() as conn:
+        orphans = sweep_orphans(conn)
+        if user_id:
+            users = [user_id]
+        else:
+            users = [r[0] for r in conn.execute(
+                "SELECT DISTINCT user_id FROM daily_totals WHERE day < ?", (cutoff,))]
+        for user in users:
+            count = archive_user(conn, user, cutoff)
+            if count:
+                moved[user] = count
+    logger.info(f"Archived {sum(moved.values())} transactions for {len(moved)} users (before {cutoff}).")
+    return {"cutoff": cutoff, "users": len(moved), "rows": sum(moved.values()), "orphans_removed": orphans}
+
+
+# --- EXPORT ---
+class _Chunks(io.RawIOBase):
+    """Write-only sink whose buffered bytes are taken out after every batch."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _export_batches(user_id: str, db_file: str) -> Iterator:
+    """
+    Archived rows, then hot rows in EXPORT_BATCH_ROWS pages. Both come from one read
+    transaction on a private connection, so an archive run cannot move rows mid-export.
+    """
+    # StreamingResponse advances sync generators on threadpool workers, so successive
+    # pages may run on different threads; the connection never leaves this generator.
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        yield from iter_archive_batches(archived_parts(cursor, user_id))
+
+        after = ("", 0)
+        while True:
+            cursor.execute(
+                "SELECT * FROM transactions WHERE user_id = ? AND (date, id) > (?, ?) ORDER BY date, id LIMIT ?",
+                (user_id, *after, EXPORT_BATCH_ROWS)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            yield rows_to_batch(rows)
+            after = (rows[-1][1], rows[-1][0])
+    finally:
+        conn.close()
+
+
+def iter_export(user_id: str, fmt: str = "arrow", db_file: str = DB_FILE) -> Iterator[bytes]:
+    """A user's full history as an Arrow IPC stream or a Parquet file, one batch in memory at a time."""
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+
+    sink = _Chunks()
+    schema = archive_schema()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=ARCHIVE_COMPRESSION)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    with writer:
+        for batch in _export_batches(user_id, db_file):
+            if batch.num_rows:
+                writer.write_batch(batch)
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    yield sink.take()
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Move old transactions into the Parquet archive tier.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive rows older than this")
+    parser.add_argument("--user", help="only this user")
+    args = parser.parse_args(argv)
+    if args.days <= API_WINDOW_DAYS:
+        parser.error(f"--days must be above {API_WINDOW_DAYS}; the API reads raw transactions that far back")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from database import init_db
+    init_db()
+    print(archive_all(args.days, args.user))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,339 @@
+"""
+BufferZen benchmark and load-test suite.
+
+Seeds a throwaway SQLite file with synthetic multi-user histories (mock_data.py),
+times the calculation functions at several history lengths, then load-tests the
+FastAPI app in-process. Prints one JSON report so runs can be diffed between commits:
+
+    python benchmark.py --users 50 --years 1,3 --requests 2000 --concurrency 16 > bench.json
+
+Cold start is measured in fresh interpreters; as a CI guard:
+
+    python benchmark.py --skip-micro --skip-load --max-startup-ms 1500
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import statistics
+import tracemalloc
+from datetime import datetime, timedelta
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def summarize(latencies_s, elapsed_s=None):
+    ms = [x * 1000 for x in latencies_s]
+    report = {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+    }
+    total = elapsed_s if elapsed_s is not None else sum(latencies_s)
+    report["throughput_per_s"] = round(len(ms) / total, 1) if total else 0.0
+    return report
+
+def timed(fn, repeat):
+    """
+    Run fn `repeat` times for latency, then once more under tracemalloc for its peak
+    allocation (tracing is kept out of the timed runs; it slows Python code severalfold).
+    """
+    fn()  # warm-up
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**summarize(latencies), "peak_mem_kb": round(peak / 1024, 1)}
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def rows_to_csv(rows):
+    out = io.StringIO()
+    out.write("date,description,amount,type\n")
+    for r in rows:
+        out.write(f"{r['date']},{r['description']},{r['amount']},{'CR' if r['type'] == 'Income' else 'DR'}\n")
+    return out.getvalue().encode()
+
+
+# --- SEEDING ---
+def seed_database(histories):
+    from database import get_db_connection
+    from aggregates import rebuild_daily_totals
+    from categorizer import smart_categorize
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for user_id, rows in histories.items():
+            cursor.executemany(
+                "INSERT INTO transactions (date, type, category, amount, description, user_id) VALUES (?, ?, ?, ?, ?, ?)",
+                [(r['date'], r['type'], smart_categorize(r['description']), r['amount'], r['description'], user_id) for r in rows]
+            )
+        rebuild_daily_totals(cursor)
+        conn.commit()
+
+
+# --- MICRO BENCHMARKS ---
+def micro_benchmarks(history_years, repeat):
+    import pandas as pd
+    from mock_data import generate_student_gig_rows
+    from aggregates import fetch_daily_arrays, day_number
+    from calculations import calculate_metrics, calculate_analytics
+    from routers.budget import calculate_metrics_from_rows
+    from database import get_db_connection
+    from categorizer import smart_categorize, categorize_series
+    from statements import iter_statement
+    from stress import load_daily_history, simulate_survival
+
+    results = {}
+    for years in history_years:
+        rng = random.Random(years)
+        user_id = f"micro-{years}y"
+        rows = []
+        for _ in range(3):   # a heavy user: three generators' worth of activity
+            rows.extend(generate_student_gig_rows(years * 12, rng))
+        seed_database({user_id: rows})
+
+        six_months_ago = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            daily = fetch_daily_arrays(cursor, user_id, six_months_ago)
+            fetch_timing = timed(lambda: fetch_daily_arrays(cursor, user_id, six_months_ago), repeat)
+            raw = [dict(r) for r in cursor.execute(
+                "SELECT * FROM transactions WHERE user_id = ? AND date >= ?", (user_id, six_months_ago))]
+            history = load_daily_history(cursor, user_id)
+        last_30 = daily.since(int(day_number(datetime.now())) - 30)
+
+        descriptions = [r['description'] for r in rows]
+        csv_bytes = rows_to_csv(rows)
+
+        def parse_statement():
+            for _ in iter_statement(io.BytesIO(csv_bytes), user_id):
+                pass
+
+        results[f"{years}y"] = {
+            "rows": len(rows),
+            "window_rows": len(raw),
+            "fetch_daily_arrays": fetch_timing,
+            "calculate_metrics": timed(lambda: calculate_metrics(daily, 6500), repeat),
+            "calculate_metrics_from_rows": timed(lambda: calculate_metrics_from_rows(raw, 6500), repeat),
+            "calculate_analytics": timed(lambda: calculate_analytics(last_30), repeat),
+            "smart_categorize_all_rows": timed(lambda: [smart_categorize(d) for d in descriptions], max(repeat // 10, 3)),
+            "categorize_series_all_rows": timed(lambda: categorize_series(pd.Series(descriptions)), max(repeat // 10, 3)),
+            "parse_statement": timed(parse_statement, max(repeat // 10, 3)),
+            "stress_10k_paths": timed(lambda: simulate_survival(*history, paths=10000), max(repeat // 10, 3)),
+        }
+    return results
+
+
+# --- STARTUP ---
+# Modules that must stay out of a cold start; each is imported by the first request that needs it.
+LAZY_MODULES = ("pandas", "PIL", "pytesseract", "pyarrow")
+
+STARTUP_PROBE = """
+import sys, json, time, asyncio
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [m for m in %r if m in sys.modules]
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(boot())
+print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (time.perf_counter() - imported) * 1000,
+                  "lazy_modules_loaded": loaded}))
+"""
+
+def startup_benchmark(runs):
+    """Cold start in fresh interpreters: interpreter launch, `import main`, then the app lifespan."""
+    env = dict(os.environ, SNAPSHOT_SCHEDULE="0")
+    process_ms, import_ms, lifespan_ms, loaded = [], [], [], set()
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", STARTUP_PROBE % (LAZY_MODULES,)], env=env,
+                             cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True, check=True)
+        process_ms.append((time.perf_counter() - started) * 1000)
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        import_ms.append(probe["import_ms"])
+        lifespan_ms.append(probe["lifespan_ms"])
+        loaded.update(probe["lazy_modules_loaded"])
+    return {
+        "runs": runs,
+        "process_p50_ms": round(percentile(process_ms, 50), 1),
+        "import_p50_ms": round(percentile(import_ms, 50), 1),
+        "lifespan_p50_ms": round(percentile(lifespan_ms, 50), 1),
+        "lazy_modules_loaded": sorted(loaded),
+    }
+
+def startup_regressions(startup, max_ms):
+    problems = [f"{m} imported at startup" for m in startup["lazy_modules_loaded"]]
+    total = startup["import_p50_ms"] + startup["lifespan_p50_ms"]
+    if max_ms is not None and total > max_ms:
+        problems.append(f"startup took {total:.0f}ms (budget {max_ms:.0f}ms)")
+    return problems
+
+
+# --- HTTP LOAD TEST ---
+async def load_test(user_ids, total_requests, concurrency, upload_rows):
+    import httpx
+    import logging
+    import main
+    logging.getLogger().setLevel(logging.WARNING)   # main configures INFO; per-request client logs would dominate
+
+    transport = httpx.ASGITransport(app=main.app)
+    upload_csv = rows_to_csv(upload_rows)
+    scenarios = {
+        "GET /budget": lambda c, u: c.get("/api/v1/budget", params={"user_id": u, "fixed_costs": 6500}),
+        "GET /analytics": lambda c, u: c.get("/api/v1/analytics", params={"user_id": u}),
+        "GET /dashboard": lambda c, u: c.get("/api/v1/dashboard", params={"user_id": u, "fixed_costs": 6500}),
+        "POST /transactions": lambda c, u: c.post("/api/v1/transactions", json={
+            "user_id": u, "amount": 120, "type": "Expense", "description": "Zomato order"}),
+        "POST /upload-statement": lambda c, u: c.post(
+            "/api/v1/upload-statement", params={"user_id": u},
+            files={"file": ("statement.csv", upload_csv, "text/csv")}),
+    }
+    # Read-heavy mix, roughly what a dashboard session produces.
+    weights = {"GET /budget": 30, "GET /analytics": 20, "GET /dashboard": 40, "POST /transactions": 9, "POST /upload-statement": 1}
+    plan = random.Random(7).choices(list(weights), weights=list(weights.values()), k=total_requests)
+
+    latencies = {name: [] for name in scenarios}
+    errors = {name: 0 for name in scenarios}
+    queue = asyncio.Queue()
+    for i, name in enumerate(plan):
+        queue.put_nowait((name, user_ids[i % len(user_ids)]))
+
+    async def worker(client):
+        while True:
+            try:
+                name, user_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await scenarios[name](client, user_id)
+            latencies[name].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[name] += 1
+
+    # ASGITransport does not run the app lifespan, so start the import workers here.
+    from jobs import job_queue
+    job_queue.start()
+    started = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    job_queue.stop()
+
+    all_latencies = [x for samples in latencies.values() for x in samples]
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, elapsed),
+        "endpoints": {name: {**summarize(samples, elapsed), "errors": errors[name]}
+                      for name, samples in latencies.items() if samples},
+    }
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=20, help="users seeded for the load test")
+    parser.add_argument("--months", type=int, default=24, help="history length per load-test user")
+    parser.add_argument("--years", default="1,3", help="comma-separated history lengths for micro benchmarks")
+    parser.add_argument("--repeat", type=int, default=200, help="iterations per micro benchmark")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--with-cache", action="store_true", help="keep the response cache on during the load test")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--startup-runs", type=int, default=5, help="fresh interpreters timed for cold start (0 skips)")
+    parser.add_argument("--max-startup-ms", type=float, help="exit 1 if median import + lifespan exceeds this")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bufferzen-bench-")
+    # Configuration is read at import time, so it has to be in place before main loads.
+    os.environ["BUFFERZEN_DB"] = os.path.join(workdir, "bench.db")
+    os.environ["CACHE_BACKEND"] = "local"
+    os.environ["IMPORT_JOBS_DIR"] = os.path.join(workdir, "jobs")
+    if not args.with_cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+
+    import logging
+    from database import init_db
+    init_db()   # normally run by the app lifespan
+    from mock_data import generate_multi_user_data, generate_student_gig_rows
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": vars(args),
+    }
+
+    started = time.perf_counter()
+    histories = generate_multi_user_data(users=args.users, months=args.months)
+    seed_database(histories)
+    report["seed"] = {
+        "users": args.users,
+        "rows": sum(len(rows) for rows in histories.values()),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+    if args.startup_runs:
+        report["startup"] = startup_benchmark(args.startup_runs)
+        report["startup"]["regressions"] = startup_regressions(report["startup"], args.max_startup_ms)
+
+    if not args.skip_micro:
+        years = [int(y) for y in args.years.split(",") if y.strip()]
+        report["micro"] = micro_benchmarks(years, args.repeat)
+
+    if not args.skip_load:
+        upload_rows = generate_student_gig_rows(1, random.Random(1))
+        report["load"] = asyncio.run(load_test(list(histories), args.requests, args.concurrency, upload_rows))
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["peak_rss_mb"] = round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if report.get("startup", {}).get("regressions"):
+        sys.exit("Startup regression: " + "; ".join(report["startup"]["regressions"]))
+
+
+if __name__ == "__main__":
+    main_cli()
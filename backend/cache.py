@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import asyncio
+import functools
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# --- CONFIG ---
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")          # "local" or "sqlite"
+CACHE_FILE = os.getenv("CACHE_FILE", "bufferzen_cache.db")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_EVICT_EVERY = 256      # sqlite backend: sets between eviction passes
+
+
+# --- BACKENDS ---
+class CacheBackend(ABC):
+    """
+    Storage for cached responses plus the per-user data versions that key them.
+    Versions must be visible to every worker that serves the user, so a backend
+    shared between processes has to share both. A backend whose calls do I/O sets
+    `blocking`, and async callers then make them off the event loop.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    @abstractmethod
+    def get_version(self, user_id: str) -> int: ...
+
+    @abstractmethod
+    def bump_version(self, user_id: str) -> int: ...
+
+    @abstractmethod
+    def size(self) -> int: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class LocalCache(CacheBackend):
+    """In-process LRU with per-entry TTL. Only correct with a single worker."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump_version(self, user_id):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return self._versions[user_id]
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache in a local SQLite file, shared by every worker process on the host.
+    A stand-in for a networked cache: values are stored as JSON, eviction is by
+    oldest access once `max_entries` is exceeded, checked every `evict_every` sets
+    so a set is not an ordered scan of the table.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = CACHE_MAX_ENTRIES,
+                 evict_every: int = CACHE_EVICT_EVERY):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._sets = 0
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_versions (user_id TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA busy_timeout = 2000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now)
+        )
+        self._sets += 1
+        if self._sets % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        self._conn().execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            "SELECT key FROM cache_entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def get_version(self, user_id):
+        row = self._conn().execute("SELECT version FROM cache_versions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, user_id):
+        row = self._conn().execute(
+            "INSERT INTO cache_versions (user_id, version) VALUES (?, 1) "
+            "ON CONFLICT(user_id) DO UPDATE SET version = version + 1 RETURNING version",
+            (user_id,)
+        ).fetchone()
+        return row[0]
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache_entries")
+
+
+# --- RESPONSE CACHE ---
+class ResponseCache:
+    """
+    Memoizes computed responses under (namespace, user, data version, params).
+    Writers call bump_version after committing, which orphans every cached response
+    for that user; orphaned entries age out through LRU/TTL eviction.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, namespace: str, user_id: str, params: tuple) -> Tuple[str, Any]:
+        # The version is read before compute() touches the database, so a write that
+        # lands mid-computation can only leave its result under the outdated version.
+        version = self.backend.get_version(user_id)
+        key = f"{namespace}:{user_id}:{version}:{json.dumps(params)}"
+
+        value = self.backend.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return key, value
+
+    def get_or_compute(self, namespace: str, user_id: str, params: tuple, compute: Callable[[], Any]) -> Any:
+        key, value = self._lookup(namespace, user_id, params)
+        if value is not None:
+            return value
+
+        value = compute()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    async def get_or_compute_async(self, namespace: str, user_id: str, params: tuple,
+                                   compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        get_or_compute for async handlers. Lookups and stores run on the event loop for
+        the local backend (a dict) and in the default executor for a blocking one.
+        """
+        key, value = await self._off_loop(self._lookup, namespace, user_id, params)
+        if value is not None:
+            return value
+
+        value = await compute()
+        await self._off_loop(self.backend.set, key, value, self.ttl)
+        return value
+
+    async def _off_loop(self, fn: Callable, *args) -> Any:
+        if not self.backend.blocking:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+
+    def data_version(self, user_id: str) -> int:
+        return self.backend.get_version(user_id)
+
+    async def data_version_async(self, user_id: str) -> int:
+        return await self._off_loop(self.backend.get_version, user_id)
+
+    def bump_version(self, user_id: str) -> int:
+        return self.backend.bump_version(user_id)
+
+    async def bump_version_async(self, user_id: str) -> int:
+        return await self._off_loop(self.backend.bump_version, user_id)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": self.backend.size(),
+            "max_entries": getattr(self.backend, "max_entries", None),
+            "ttl_seconds": self.ttl,
+        }
+
+
+def make_backend(name: str = CACHE_BACKEND) -> CacheBackend:
+    if name == "sqlite":
+        return SQLiteCache()
+    return LocalCache()
+
+response_cache = ResponseCache(make_backend())
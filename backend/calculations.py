@@ -0,0 +1,165 @@
+import calendar
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+from aggregates import DailyArrays, day_number
+
+# --- CORE CALCULATION ENGINE ---
+# Works on DailyArrays (one entry per active day, sorted). Every date window is a
+# searchsorted into `days` and a difference of prefix sums, so a request costs a few
+# vectorized passes over at most ~180 buckets and no per-row Python.
+EMPTY_METRICS = {
+    "daily_limit": 0,
+    "survival_horizon": 0,
+    "current_balance": 0,
+    "daily_avg": 0,
+    "burn_rate": 0,
+    "resilience_score": 0,
+    "volatility_score": "N/A",
+    "monthly_avg": 0,
+    "limit_change_pct": 0.0,
+    "horizon_change": 0,
+    "resilience_change_pct": 0.0
+}
+
+
+class Windows:
+    """Prefix sums over DailyArrays; `sum(start, end)` totals buckets with start <= day < end."""
+
+    def __init__(self, daily: DailyArrays):
+        self.days = daily.days
+        self.income = np.concatenate(([0.0], np.cumsum(daily.income)))
+        self.expense = np.concatenate(([0.0], np.cumsum(daily.expense)))
+
+    def _index(self, day: Optional[float]) -> int:
+        return len(self.days) if day is None else int(np.searchsorted(self.days, day, side="left"))
+
+    def sum(self, start: float, end: Optional[float] = None):
+        lo, hi = self._index(start), self._index(end)
+        return float(self.income[hi] - self.income[lo]), float(self.expense[hi] - self.expense[lo])
+
+    def burn_rate(self, now: float) -> float:
+        """Last 7 days of spend vs the 7 days before, as a percentage change."""
+        last_week = self.sum(now - 7)[1]
+        prev_week = self.sum(now - 14, now - 7)[1]
+        return ((last_week - prev_week) / prev_week * 100) if prev_week > 0 else 0
+
+
+def budget_levels(balance: float, fixed_costs: float, days_in_month: int):
+    """(safe daily limit, survival horizon in days, resilience score) for a balance."""
+    daily_fixed_burn = fixed_costs / days_in_month
+    limit = max(0, (balance - fixed_costs) / days_in_month)
+    horizon = (balance / daily_fixed_burn) if daily_fixed_burn > 0 and balance > 0 else 0
+    resilience = int(min(100, (horizon * 2) + (20 if balance > fixed_costs else 0)))
+    return limit, horizon, resilience
+
+
+def momentum(current_net_30: float, prev_net_30: float, fixed_costs: float, days_in_month: int) -> Dict:
+    """Last-30-day vs previous-30-day deltas of the budget levels."""
+    current_limit_30, current_horizon_30, current_resilience_30 = budget_levels(current_net_30, fixed_costs, days_in_month)
+    prev_limit_30, prev_horizon_30, prev_resilience_30 = budget_levels(prev_net_30, fixed_costs, days_in_month)
+
+    limit_change_pct = ((current_limit_30 - prev_limit_30) / prev_limit_30 * 100) if prev_limit_30 > 0 else (100.0 if current_limit_30 > 0 else 0.0)
+    horizon_change = int(current_horizon_30 - prev_horizon_30)
+    resilience_change_pct = ((current_resilience_30 - prev_resilience_30) / prev_resilience_30 * 100) if prev_resilience_30 > 0 else (100.0 if current_resilience_30 > 0 else 0.0)
+    return {
+        "limit_change_pct": round(limit_change_pct, 1),
+        "horizon_change": horizon_change,
+        "resilience_change_pct": round(resilience_change_pct, 1)
+    }
+
+
+def monthly_income_series(daily: DailyArrays) -> np.ndarray:
+    """Income per calendar month from the first to the last income month, empty months as 0."""
+    has_income = daily.income_count > 0
+    if not has_income.any():
+        return np.zeros(0)
+    months = daily.days[has_income].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return np.bincount(months - months[0], weights=daily.income[has_income])
+
+
+def calculate_metrics(daily: DailyArrays, fixed_costs: float, now: Optional[datetime] = None,
+                      prev_net_30: Optional[float] = None) -> Dict:
+    """
+    Budget metrics from a user's last six months of daily buckets. `prev_net_30` is the
+    net of the previous 30-day window when a stored snapshot has it (see snapshots.py).
+    """
+    if not len(daily.days):
+        return dict(EMPTY_METRICS)
+
+    now = now or datetime.now()
+    today = day_number(now)
+    windows = Windows(daily)
+
+    current_balance = float(windows.income[-1] - windows.expense[-1])
+    expense_total = float(windows.expense[-1])
+
+    expense_days = daily.days[daily.expense_count > 0]
+    if len(expense_days):
+        date_range = int(expense_days[-1] - expense_days[0]) + 1
+        daily_avg = expense_total / max(date_range, 1)
+        burn_rate = windows.burn_rate(today)
+    else:
+        daily_avg = 0
+        burn_rate = 0
+
+    monthly_income = monthly_income_series(daily)
+    if len(monthly_income):
+        avg_monthly_income = float(monthly_income.mean())
+        income_volatility = float(monthly_income.std(ddof=1)) if len(monthly_income) > 1 else 0
+    else:
+        avg_monthly_income = 0
+        income_volatility = 0
+
+    cv = (income_volatility / avg_monthly_income) if avg_monthly_income > 0 else 0
+    volatility_score = "High" if cv > 0.3 else "Low"
+
+    days_in_month = calendar.monthrange(now.year, now.month)[1]
+
+    daily_safe_limit, survival_days, resilience_score = budget_levels(current_balance, fixed_costs, days_in_month)
+
+    # --- MOMENTUM CALCULATIONS (Last 30 days vs Previous 30 days) ---
+    current_income, current_expense = windows.sum(today - 30)
+    if prev_net_30 is None:
+        prev_income, prev_expense = windows.sum(today - 60, today - 30)
+        prev_net_30 = prev_income - prev_expense
+
+    return {
+        "daily_limit": round(daily_safe_limit, 2),
+        "survival_horizon": int(survival_days),
+        "current_balance": round(current_balance, 2),
+        "daily_avg": round(daily_avg, 2),
+        "burn_rate": round(burn_rate, 1),
+        "resilience_score": max(0, resilience_score),
+        "volatility_score": volatility_score,
+        "monthly_avg": round(avg_monthly_income, 2),
+        **momentum(current_income - current_expense, prev_net_30, fixed_costs, days_in_month)
+    }
+
+
+def calculate_analytics(daily: DailyArrays, now: Optional[datetime] = None) -> Dict:
+    """7-day spend series plus daily average and burn rate over the given buckets (the last 30 days)."""
+    if not len(daily.days):
+        return {"labels": [], "values": [], "stats": {"daily_avg": 0, "burn_rate": 0}}
+
+    now = now or datetime.now()
+    windows = Windows(daily)
+
+    last_7_days = np.floor(day_number(now)) - np.arange(6, -1, -1)
+    slots = np.searchsorted(daily.days, last_7_days)
+    found = (slots < len(daily.days)) & (daily.days[np.minimum(slots, len(daily.days) - 1)] == last_7_days)
+    spent = daily.expense[np.minimum(slots, len(daily.days) - 1)]
+
+    days_count = int(daily.days[-1] - daily.days[0]) + 1
+    daily_avg = float(windows.expense[-1]) / max(days_count, 1)
+
+    return {
+        "labels": [(now - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(6, -1, -1)],
+        "values": [round(float(v), 2) if hit else 0 for v, hit in zip(spent, found)],
+        "stats": {
+            "daily_avg": round(daily_avg, 2),
+            "burn_rate": round(windows.burn_rate(day_number(now)), 1)
+        }
+    }
@@ -0,0 +1,125 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# --- SMART CATEGORIZATION ---
+# Checked in order: the first category with a matching keyword wins.
+CATEGORY_KEYWORDS = {
+    "Investment": ["zerodha", "groww", "stocks", "sip", "mutual fund", "etf"],
+    "Food": ["chai", "zomato", "swiggy", "mess", "canteen", "restaurant", "cafe"],
+    "Fixed": ["rent", "fees", "hostel", "electricity", "internet", "subscription"],
+    "Transport": ["uber", "ola", "metro", "bus", "fuel", "petrol"],
+    "Shopping": ["amazon", "flipkart", "myntra", "shopping", "clothes"],
+    "Entertainment": ["netflix", "spotify", "movie", "theatre", "game"]
+}
+DEFAULT_CATEGORY = "Variable"
+MATCHER_CACHE_SIZE = 1024
+
+
+class CategoryMatcher:
+    """
+    All keywords compiled into one regex. Each rule becomes a capture group inside a
+    lookahead, so a single scan sees every (possibly overlapping) keyword hit and the
+    highest-priority rule among them wins, the same result as checking rules in order.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, Sequence[str]]]):
+        self.categories = [category for category, keywords in rules if keywords]
+        alternation = "|".join(
+            "(" + "|".join(re.escape(k.lower()) for k in keywords) + ")"
+            for _, keywords in rules if keywords
+        )
+        self._pattern = re.compile(f"(?=(?:{alternation}))") if alternation else None
+
+    def match(self, description: str) -> str:
+        if self._pattern is None:
+            return DEFAULT_CATEGORY
+        best = None
+        for m in self._pattern.finditer(description.lower()):
+            if best is None or m.lastindex < best:
+                best = m.lastindex
+                if best == 1:
+                    break
+        return self.categories[best - 1] if best else DEFAULT_CATEGORY
+
+    def match_many(self, descriptions: Sequence[str]) -> List[str]:
+        """Categorize a batch, matching each distinct description only once."""
+        memo: Dict[str, str] = {}
+        for d in descriptions:
+            if d not in memo:
+                memo[d] = self.match(d)
+        return [memo[d] for d in descriptions]
+
+    def match_series(self, descriptions: "pd.Series") -> "pd.Series":
+        """Categorize a whole column, matching each distinct description only once."""
+        import pandas as pd   # statement imports only; keeps pandas off the request path
+
+        codes, uniques = pd.factorize(descriptions.astype(str), use_na_sentinel=False)
+        categories = np.array([self.match(u) for u in uniques], dtype=object)
+        return pd.Series(categories[codes], index=descriptions.index)
+
+
+default_matcher = CategoryMatcher(list(CATEGORY_KEYWORDS.items()))
+
+def smart_categorize(description: str) -> str:
+    return default_matcher.match(description)
+
+def categorize_series(descriptions: "pd.Series") -> "pd.Series":
+    return default_matcher.match_series(descriptions)
+
+
+# --- USER RULES ---
+# User keywords are matched before the built-in ones, earliest rule first.
+CATEGORY_RULES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS category_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        keyword TEXT NOT NULL,
+        category TEXT NOT NULL
+    )
+'''
+
+_matchers: "OrderedDict[str, Tuple[tuple, CategoryMatcher]]" = OrderedDict()
+_matchers_lock = threading.Lock()
+
+def build_rules(user_rules: List[dict]) -> List[Tuple[str, List[str]]]:
+    grouped: "OrderedDict[str, List[str]]" = OrderedDict()
+    for rule in user_rules:
+        grouped.setdefault(rule['category'], []).append(rule['keyword'])
+    return list(grouped.items()) + list(CATEGORY_KEYWORDS.items())
+
+def get_matcher(cursor, user_id: str) -> CategoryMatcher:
+    """
+    Compiled matcher for one user. Cached per user and keyed on the rule set's
+    (count, max id) stamp, so adding or deleting a rule in any worker invalidates it.
+    """
+    cursor.execute("SELECT COUNT(*), MAX(id) FROM category_rules WHERE user_id = ?", (user_id,))
+    stamp = tuple(cursor.fetchone())
+    if not stamp[0]:
+        return default_matcher
+
+    with _matchers_lock:
+        cached = _matchers.get(user_id)
+        if cached and cached[0] == stamp:
+            _matchers.move_to_end(user_id)
+            return cached[1]
+
+    cursor.execute("SELECT keyword, category FROM category_rules WHERE user_id = ? ORDER BY id", (user_id,))
+    matcher = CategoryMatcher(build_rules([dict(r) for r in cursor.fetchall()]))
+
+    with _matchers_lock:
+        _matchers[user_id] = (stamp, matcher)
+        _matchers.move_to_end(user_id)
+        while len(_matchers) > MATCHER_CACHE_SIZE:
+            _matchers.popitem(last=False)
+    return matcher
+
+def invalidate_matcher(user_id: str) -> None:
+    with _matchers_lock:
+        _matchers.pop(user_id, None)
@@ -0,0 +1,211 @@
+import os
+import queue
+import logging
+import sqlite3
+from contextlib import contextmanager
+
+from aggregates import init_daily_totals
+from categorizer import CATEGORY_RULES_SCHEMA
+from dedup import FINGERPRINT_INDEX
+from history import TRANSACTIONS_FTS_SCHEMA, DROP_TRANSACTIONS_FTS
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+DB_FILE = os.getenv("BUFFERZEN_DB", "bufferzen.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+# Applied to every pooled connection. WAL lets dashboard reads proceed while an
+# import is writing; synchronous=NORMAL is durable under WAL except on power loss.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",      # ~16MB page cache per connection
+    "PRAGMA mmap_size = 268435456",    # 256MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+# --- CONNECTION POOL ---
+class ConnectionPool:
+    """
+    Fixed-size pool of sqlite3 connections shared across request threads.
+
+    A connection is only ever used by one thread at a time, so it is safe to open
+    them with check_same_thread=False. Connections beyond `size` that are checked
+    out under burst load are closed on return instead of being kept.
+    """
+
+    def __init__(self, db_file: str, size: int = DB_POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Returns rows as dictionaries
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+pool = ConnectionPool(DB_FILE)
+
+def get_db_connection():
+    """Borrow a pooled connection: `with get_db_connection() as conn: ...`"""
+    return pool.connection()
+
+def open_connection() -> sqlite3.Connection:
+    """A connection with the pool's pragmas that the caller owns and closes (long-lived DB threads)."""
+    return pool._connect()
+
+
+# --- SCHEMA ---
+TRANSACTIONS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT NOT NULL,
+        user_id TEXT NOT NULL
+    )
+'''
+
+# One row per (user, file content). Progress is committed in the same transaction
+# as each chunk's rows, so a restarted job skips exactly the chunks already stored.
+IMPORT_JOBS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS import_jobs (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        path TEXT NOT NULL,
+        status TEXT NOT NULL,
+        bytes_total INTEGER NOT NULL,
+        bytes_processed INTEGER NOT NULL DEFAULT 0,
+        chunks_done INTEGER NOT NULL DEFAULT 0,
+        rows_inserted INTEGER NOT NULL DEFAULT 0,
+        rows_rejected INTEGER NOT NULL DEFAULT 0,
+        rejects TEXT NOT NULL DEFAULT '[]',
+        error TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        UNIQUE (user_id, content_hash)
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_import_jobs_status ON import_jobs (status, created_at)",
+]
+
+# One row per (user, day): the budget inputs that do not depend on a user's fixed
+# costs, computed nightly by snapshots.py. Rows from a day onwards are deleted when
+# transactions dated that day arrive (aggregates.record_transactions).
+METRIC_SNAPSHOTS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS metric_snapshots (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        balance REAL NOT NULL,
+        net_30 REAL NOT NULL,
+        daily_avg REAL NOT NULL,
+        burn_rate REAL NOT NULL,
+        monthly_avg REAL NOT NULL,
+        income_cv REAL NOT NULL,
+        computed_at TEXT NOT NULL,
+        PRIMARY KEY (user_id, day)
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_metric_snapshots_day ON metric_snapshots (day)",
+]
+
+# Parquet files holding a user's archived transactions (archive.py). A file only counts
+# once its row is committed, in the same transaction that deletes the rows it holds.
+ARCHIVE_PARTS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS archive_parts (
+        path TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        first_date TEXT NOT NULL,
+        last_date TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_archive_parts_user ON archive_parts (user_id, first_date)",
+]
+
+
+# Applied in order; PRAGMA user_version records how many have run on a database.
+MIGRATIONS = [
+    # 1: per-user date-window scans and "ORDER BY date DESC, id DESC" history reads
+    [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_date_amount ON transactions (user_id, date, type, amount)",
+    ],
+    # 2: user-defined categorization keywords
+    [
+        CATEGORY_RULES_SCHEMA,
+        "CREATE INDEX IF NOT EXISTS idx_category_rules_user ON category_rules (user_id, id)",
+    ],
+    # 3: full-text search over descriptions for the history API
+    TRANSACTIONS_FTS_SCHEMA,
+    # 4: background statement import queue
+    IMPORT_JOBS_SCHEMA,
+    # 5: duplicate detection for overlapping statement uploads
+    [
+        FINGERPRINT_INDEX,
+        "ALTER TABLE import_jobs ADD COLUMN rows_duplicate INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE import_jobs ADD COLUMN fuzzy_days INTEGER NOT NULL DEFAULT 0",
+    ],
+    # 6: nightly per-user metric snapshots
+    METRIC_SNAPSHOTS_SCHEMA,
+    # 7: Parquet archive tier for old transactions
+    ARCHIVE_PARTS_SCHEMA,
+    # 8: fingerprint index over fully collapsed whitespace (dedup.normalized)
+    [
+        "DROP INDEX IF EXISTS idx_transactions_fingerprint",
+        FINGERPRINT_INDEX,
+    ],
+    # 9: user_id in the full-text index, so searches stay within one user's rows
+    DROP_TRANSACTIONS_FTS + TRANSACTIONS_FTS_SCHEMA,
+]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {number}")
+        logger.info(f"Applied schema migration {number}.")
+    return len(MIGRATIONS)
+
+def init_db():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TRANSACTIONS_SCHEMA)
+        init_daily_totals(cursor)
+        run_migrations(conn)
+        conn.commit()
+    logger.info("SQLite database initialized successfully.")
@@ -0,0 +1,128 @@
+import json
+import string
+from datetime import date, timedelta
+from typing import Iterable, List, Set, Tuple
+
+# --- DUPLICATE DETECTION ---
+# A transaction's fingerprint is (user_id, date, amount, normalized description).
+# Normalization lives in SQL so the index and the lookups share one definition:
+# lowercase, trimmed, tabs and runs of spaces of any length collapsed to one space.
+# SQLite has no regex replace, so runs collapse by marking every space with a
+# following char(1), deleting each mark that is followed by another space, then
+# deleting the marks left over.
+MAX_FUZZY_DAYS = 7
+
+
+def normalized(column: str) -> str:
+    spaced = f"replace({column}, char(9), ' ')"
+    collapsed = f"replace(replace(replace({spaced}, ' ', ' ' || char(1)), char(1) || ' ', ''), char(1), '')"
+    return f"lower(trim({collapsed}))"
+
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def normalize_description(text: str) -> str:
+    """normalized() in Python, step for step, for archived rows; SQLite's lower() and trim() only touch ASCII."""
+    spaced = text.replace("\t", " ")
+    collapsed = spaced.replace(" ", " \x01").replace("\x01 ", "").replace("\x01", "")
+    return collapsed.strip(" ").translate(_ASCII_LOWER)
+
+
+FINGERPRINT_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_transactions_fingerprint "
+    f"ON transactions (user_id, date, amount, {normalized('description')})"
+)
+
+# Incoming rows are passed as one JSON array per chunk and probed against the
+# fingerprint index row by row inside SQLite (CROSS JOIN keeps `incoming` outermost).
+_INCOMING = '''
+    WITH incoming AS (
+        SELECT key AS pos,
+               json_extract(value, '$[0]') AS date,
+               json_extract(value, '$[1]') AS amount,
+               json_extract(value, '$[2]') AS description
+        FROM json_each(?)
+    )
+'''
+
+EXACT_MATCHES = _INCOMING + f'''
+    SELECT incoming.pos, t.id, 0 AS distance
+    FROM incoming CROSS JOIN transactions t
+    WHERE t.user_id = ? AND t.date = incoming.date AND t.amount = incoming.amount
+      AND {normalized('t.description')} = {normalized('incoming.description')}
+'''
+
+WINDOW_MATCHES = _INCOMING + f'''
+    SELECT incoming.pos, t.id, abs(julianday(t.date) - julianday(incoming.date)) AS distance
+    FROM incoming CROSS JOIN transactions t
+    WHERE t.user_id = ? AND t.date BETWEEN date(incoming.date, ?) AND date(incoming.date, ?)
+      AND t.amount = incoming.amount
+      AND {normalized('t.description')} = {normalized('incoming.description')}
+'''
+
+
+class Deduplicator:
+    """
+    Drops incoming rows that already exist for a user, one indexed query per chunk.
+
+    Matching is one-to-one: each stored row absorbs at most one incoming row, so a
+    statement with two identical ₹20 chai purchases against a history holding one of
+    them imports exactly one. Ids of rows inserted by this import are claimed too,
+    which stops later chunks of the same file from matching them.
+
+    With `window_days` > 0, rows also match stored rows with the same amount and
+    description up to that many days apart (banks often shift posting dates).
+
+    Rows dated within the user's archive tier (archive.py) are matched against the
+    archived Parquet parts as well.
+    """
+
+    def __init__(self, cursor, user_id: str, window_days: int = 0):
+        self.cursor = cursor
+        self.user_id = user_id
+        self.window_days = max(0, min(window_days, MAX_FUZZY_DAYS))
+        self._claimed: Set[int] = set()
+        cursor.execute("SELECT MAX(last_date) FROM archive_parts WHERE user_id = ?", (user_id,))
+        self._archived_through = cursor.fetchone()[0]
+
+    def filter(self, rows: List[Tuple]) -> Tuple[List[Tuple], int]:
+        """Split INSERT tuples into (new rows, number of duplicates dropped)."""
+        if not rows:
+            return rows, 0
+
+        incoming = json.dumps([(r[0], r[3], r[4]) for r in rows])
+        if self.window_days:
+            self.cursor.execute(WINDOW_MATCHES, (
+                incoming, self.user_id, f"-{self.window_days} days", f"+{self.window_days} days"))
+        else:
+            self.cursor.execute(EXACT_MATCHES, (incoming, self.user_id))
+
+        matches = self.cursor.fetchall()
+        if self._archived_through:
+            matches += self._archived_matches(rows)
+
+        # Closest stored row first, so an exact-date match always wins over a fuzzy one.
+        duplicates: Set[int] = set()
+        for pos, row_id, _distance in sorted(matches, key=lambda m: (m[2], m[0], m[1])):
+            if pos in duplicates or row_id in self._claimed:
+                continue
+            duplicates.add(pos)
+            self._claimed.add(row_id)
+
+        if not duplicates:
+            return rows, 0
+        return [r for i, r in enumerate(rows) if i not in duplicates], len(duplicates)
+
+    def _archived_matches(self, rows: List[Tuple]) -> List[Tuple]:
+        from archive import find_archived_matches
+
+        horizon = (date.fromisoformat(self._archived_through) + timedelta(days=self.window_days)).isoformat()
+        old = [pos for pos, r in enumerate(rows) if r[0] <= horizon]
+        if not old:
+            return []
+        found = find_archived_matches(self.cursor, self.user_id, [(rows[p][0], rows[p][3], rows[p][4]) for p in old],
+                                      self.window_days)
+        return [(old[i], row_id, distance) for i, row_id, distance in found]
+
+    def claim(self, ids: Iterable[int]) -> None:
+        self._claimed.update(ids)
@@ -0,0 +1,151 @@
+import os
+import json
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional, Set
+
+# --- CONFIG ---
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "local")          # "local" only: run a single worker for /stream
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "64"))
+MAX_STREAMS_PER_USER = int(os.getenv("MAX_STREAMS_PER_USER", "8"))
+HEARTBEAT_SECONDS = 15.0
+
+# Delivered in place of events to a subscriber that fell EVENT_QUEUE_SIZE behind;
+# the stream closes and the client reconnects and reloads instead of missing updates.
+OVERFLOW = object()
+
+
+class TooManyStreams(Exception):
+    pass
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """One Server-Sent Events message; `data` is sent as single-line JSON."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """
+    One open stream. Events are handed over from any thread with
+    call_soon_threadsafe and read on the event loop that created it.
+    """
+
+    def __init__(self, user_id: str, fixed_costs: float, loop: asyncio.AbstractEventLoop,
+                 max_queued: int = EVENT_QUEUE_SIZE):
+        self.user_id = user_id
+        self.fixed_costs = fixed_costs
+        self.loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(max_queued)
+
+    def deliver(self, message) -> None:
+        """Thread-safe; drops the backlog and queues OVERFLOW if the reader is too slow."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(OVERFLOW)
+
+    async def next(self, timeout: float = HEARTBEAT_SECONDS):
+        """Next (event, data, id) message, OVERFLOW, or None after `timeout` seconds of quiet."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+# --- BROKERS ---
+class Broker(ABC):
+    """
+    Per-user fan-out of live update events. Writers call publish() from whichever
+    thread committed; subscribers are SSE streams. `audience` lets a writer skip
+    all work for users nobody is watching, and tells it which fixed_costs values
+    the open dashboards use. A broker shared between processes (e.g. Redis pub/sub
+    plus a presence set) has to share both.
+    """
+
+    @abstractmethod
+    def subscribe(self, user_id: str, fixed_costs: float, loop: asyncio.AbstractEventLoop) -> Subscription: ...
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription) -> None: ...
+
+    @abstractmethod
+    def audience(self, user_id: str) -> Set[float]: ...
+
+    @abstractmethod
+    def publish(self, user_id: str, event: str, data: Any, fixed_costs: Optional[float] = None) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> Dict: ...
+
+
+class LocalBroker(Broker):
+    """In-process pub/sub. Only reaches streams served by the same worker."""
+
+    def __init__(self, max_per_user: int = MAX_STREAMS_PER_USER):
+        self.max_per_user = max_per_user
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._sequence: Counter = Counter()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, user_id, fixed_costs, loop):
+        subscription = Subscription(user_id, fixed_costs, loop)
+        with self._lock:
+            if len(self._subscribers[user_id]) >= self.max_per_user:
+                raise TooManyStreams(f"At most {self.max_per_user} live streams per user")
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def audience(self, user_id):
+        with self._lock:
+            return {s.fixed_costs for s in self._subscribers.get(user_id, ())}
+
+    def publish(self, user_id, event, data, fixed_costs=None):
+        """Events tagged with `fixed_costs` only reach streams opened with that value."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+            if not subscribers:
+                return
+            self._sequence[user_id] += 1
+            message = (event, data, self._sequence[user_id])
+            self.published += 1
+        for subscription in subscribers:
+            if fixed_costs is None or subscription.fixed_costs == fixed_costs:
+                subscription.deliver(message)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "users": len(self._subscribers),
+                "streams": sum(len(s) for s in self._subscribers.values()),
+                "published": self.published,
+            }
+
+
+def make_broker(name: str = EVENT_BACKEND) -> Broker:
+    """
+    Only the in-process broker exists, so live streams are single-worker: with several
+    workers a write only reaches streams held by the worker that handled it.
+    """
+    if name == "local":
+        return LocalBroker()
+    raise ValueError(f"Unknown EVENT_BACKEND {name!r}; only 'local' (single worker) is available")
+
+broker = make_broker()
@@ -0,0 +1,127 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# --- CONFIG ---
+HISTORY_DAYS = 180
+BLOCK_DAYS = 30            # resampled in month-long runs so salary cadence survives
+MAX_HORIZON_DAYS = 1095
+DEADLINE_SPAN = 2.0        # the deadline axis runs out to twice the requested deadline
+FIXED_CATEGORIES = ("Fixed",)   # spend a cut cannot touch
+TARGET_PROBABILITY = 0.8
+
+
+def load_goal_history(cursor, user_id: str, history_days: int = HISTORY_DAYS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-calendar-day income, fixed spend and cuttable spend from the first active day in
+    the window up to today (days without activity as 0). Future-dated rows are ignored.
+    """
+    now = datetime.now()
+    placeholders = ", ".join("?" * len(FIXED_CATEGORIES))
+    cursor.execute(f'''
+        SELECT CAST(julianday(date) - julianday(?) AS INTEGER),
+               SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END),
+               SUM(CASE WHEN type = 'Expense' AND category IN ({placeholders}) THEN amount ELSE 0 END),
+               SUM(CASE WHEN type = 'Expense' AND category NOT IN ({placeholders}) THEN amount ELSE 0 END)
+        FROM transactions
+        WHERE user_id = ? AND date >= ? AND date <= ?
+        GROUP BY date ORDER BY date
+    ''', (now.strftime("%Y-%m-%d"), *FIXED_CATEGORIES, *FIXED_CATEGORIES, user_id,
+          (now - timedelta(days=history_days)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")))
+    rows = cursor.fetchall()
+    if not rows:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+
+    table = np.array(rows, dtype=np.float64)
+    offsets = (table[:, 0] - table[0, 0]).astype(np.int64)
+    span = int(-table[0, 0]) + 1
+    series = np.zeros((3, span))
+    series[:, offsets] = table[:, 1:].T
+    return series[0], series[1], series[2]
+
+
+def _block_sums(prefix: np.ndarray, starts: np.ndarray, block: int, deadlines: np.ndarray) -> np.ndarray:
+    """(paths, deadlines) totals of a series over each path's first d days, from prefix sums."""
+    full = prefix[starts[:, :-1] + block] - prefix[starts[:, :-1]]
+    cumulative = np.concatenate((np.zeros((len(starts), 1)), np.cumsum(full, axis=1)), axis=1)
+    k, r = deadlines // block, deadlines % block
+    partial_start = starts[:, k]
+    return cumulative[:, k] + prefix[partial_start + r] - prefix[partial_start]
+
+
+def project_goal(
+    income: np.ndarray,
+    fixed: np.ndarray,
+    variable: np.ndarray,
+    target: float,
+    deadline_days: int,
+    current_savings: float = 0.0,
+    max_cut: float = 0.5,
+    cut_steps: int = 50,
+    deadline_steps: int = 50,
+    paths: int = 2000,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    Probability of saving `target` (on top of `current_savings`) for every cell of a
+    cut x deadline grid, where a cut of c scales non-fixed spend by (1 - c).
+
+    Each path replays history in BLOCK_DAYS runs starting at random days (wrapping
+    around), so paydays, rent and spending habits keep their rhythm. Savings are linear
+    in the cut, so each path reduces to the smallest cut that reaches the target by a
+    deadline; a grid column is then one sort plus a searchsorted over the cut axis,
+    and the cost does not grow with the number of cuts.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    n_days = len(income)
+    needed_total = target - current_savings
+
+    horizon = min(max(int(round(deadline_days * DEADLINE_SPAN)), 1), MAX_HORIZON_DAYS)
+    deadlines = np.unique(np.rint(np.linspace(1, horizon, deadline_steps)).astype(np.int64))
+    columns = np.append(deadlines, min(deadline_days, MAX_HORIZON_DAYS))   # last column: the requested deadline
+    cuts = np.linspace(0.0, max_cut, cut_steps)
+
+    if n_days:
+        block = min(BLOCK_DAYS, n_days)
+        starts = rng.integers(0, n_days, size=(paths, horizon // block + 2))
+        totals = []
+        for series in (income, fixed, variable):
+            prefix = np.concatenate(([0.0], np.cumsum(np.concatenate((series, series)))))
+            totals.append(_block_sums(prefix, starts, block, columns))
+        saved_uncut = totals[0] - totals[1] - totals[2]
+        cuttable = totals[2]
+    else:
+        saved_uncut = np.zeros((paths, len(columns)))
+        cuttable = np.zeros((paths, len(columns)))
+
+    # Smallest cut that reaches the target per (path, deadline): -inf if none is needed,
+    # +inf if no cut can (nothing left to cut, or more than all of it).
+    with np.errstate(divide="ignore", invalid="ignore"):
+        needed_cut = (needed_total - saved_uncut) / cuttable
+    needed_cut = np.where(cuttable > 0, needed_cut, np.where(saved_uncut >= needed_total, -np.inf, np.inf))
+    needed_cut.sort(axis=0)
+
+    probability = np.empty((len(cuts), len(deadlines)))
+    for j in range(len(deadlines)):
+        probability[:, j] = np.searchsorted(needed_cut[:, j], cuts, side="right") / paths
+
+    requested = needed_cut[:, -1]
+    reaching = requested[int(np.ceil(TARGET_PROBABILITY * paths)) - 1]
+    return {
+        "cuts": np.round(cuts, 4).tolist(),
+        "deadline_days": deadlines.tolist(),
+        "probability": np.round(probability, 4).tolist(),   # [cut][deadline]
+        "requested": {
+            "deadline_days": int(columns[-1]),
+            "probability_no_cut": round(float(np.searchsorted(requested, 0.0, side="right") / paths), 4),
+            "cut_for_target_probability": round(max(float(reaching), 0.0), 4) if reaching <= 1 else None,
+            "target_probability": TARGET_PROBABILITY,
+            "daily_sacrifice": round(max(needed_total, 0.0) / max(deadline_days, 1), 2),
+        },
+        "paths": paths,
+        "history_days": n_days,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
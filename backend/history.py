@@ -0,0 +1,136 @@
+import re
+import base64
+from typing import Dict, List, Optional, Tuple
+
+# --- FULL-TEXT SEARCH ---
+# External-content FTS5 index over transactions.description, kept in sync by triggers.
+# user_id is indexed too, so a search intersects with the user's own doclist inside
+# FTS instead of matching every user's rows and filtering afterwards.
+TRANSACTIONS_FTS_SCHEMA = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, user_id, content='transactions', content_rowid='id'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts (rowid, description, user_id) VALUES (new.id, new.description, new.user_id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description, user_id)
+        VALUES ('delete', old.id, old.description, old.user_id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description, user_id)
+        VALUES ('delete', old.id, old.description, old.user_id);
+        INSERT INTO transactions_fts (rowid, description, user_id) VALUES (new.id, new.description, new.user_id);
+    END''',
+    "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')",
+]
+
+# Migration: replace a description-only index with the schema above.
+DROP_TRANSACTIONS_FTS = [
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    "DROP TABLE IF EXISTS transactions_fts",
+]
+
+MAX_PAGE_SIZE = 100
+
+
+def fetch_recent_transactions(cursor, user_id: str, limit: int = 10) -> list:
+    cursor.execute(
+        "SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT ?",
+        (user_id, limit)
+    )
+    return [dict(r) for r in cursor.fetchall()]
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(date: str, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{date}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return date, int(row_id)
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+def fts_query(text: str, user_id: Optional[str] = None) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every word must match the description, as a
+    prefix. With `user_id`, only that user's rows match (callers still filter on
+    user_id, since the phrase compares tokens: "a.b" and "a-b" look alike here).
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    match = "description : (" + " ".join(f'"{w}"*' for w in words) + ")"
+    if user_id is not None and re.search(r"[^\W_]", user_id):
+        match = 'user_id : "' + user_id.replace('"', '""') + '" AND ' + match
+    return match
+
+
+def fetch_transaction_page(
+    cursor,
+    user_id: str,
+    limit: int = 20,
+    after: Optional[str] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    search: Optional[str] = None,
+) -> Dict:
+    """
+    Newest-first page of a user's transactions using keyset pagination on (date, id).
+    The `after` cursor is the last row of the previous page, so every page is an
+    index range scan from that position, regardless of how deep it is.
+    """
+    where = ["user_id = ?"]
+    params: List = [user_id]
+
+    if after:
+        cursor_date, cursor_id = decode_cursor(after)
+        where.append("(date, id) < (?, ?)")
+        params += [cursor_date, cursor_id]
+    if type:
+        where.append("type = ?")
+        params.append(type)
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    if date_from:
+        where.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date <= ?")
+        params.append(date_to)
+    if min_amount is not None:
+        where.append("amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        where.append("amount <= ?")
+        params.append(max_amount)
+    if search:
+        match = fts_query(search, user_id)
+        if match:
+            where.append("id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)")
+            params.append(match)
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor.execute(
+        f"SELECT * FROM transactions WHERE {' AND '.join(where)} ORDER BY date DESC, id DESC LIMIT ?",
+        (*params, limit + 1)
+    )
+    rows = [dict(r) for r in cursor.fetchall()]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]['date'], rows[-1]['id']) if has_more else None
+    return {"data": rows, "next_cursor": next_cursor, "has_more": has_more}
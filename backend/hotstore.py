@@ -0,0 +1,229 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from aggregates import DailyArrays, EPOCH
+
+# --- CONFIG ---
+HOT_STORE_BYTES = int(os.getenv("HOT_STORE_BYTES", str(64 * 1024 * 1024)))   # 0 disables the store
+HOT_WINDOW_DAYS = 180          # the longest window the bucket metrics read
+ENTRY_OVERHEAD_BYTES = 512     # array headers, LRU slot and bookkeeping per user
+MIN_CAPACITY = 64
+MAX_REFUSED = 1024             # users remembered as too large to hold
+
+TYPE_CODES = {"Income": 0, "Expense": 1}
+EPOCH_DATE = EPOCH.date()
+
+
+def day_of(iso_date: str) -> int:
+    return (date.fromisoformat(iso_date) - EPOCH_DATE).days
+
+
+class HotColumns(NamedTuple):
+    """Transactions as parallel columns: 4 + 8 + 1 = 13 bytes a row."""
+    day: np.ndarray        # int32 days since 1970-01-01
+    amount: np.ndarray     # float64
+    type: np.ndarray       # uint8, TYPE_CODES
+
+
+def load_hot_columns(cursor, user_id: str, first_date: str) -> Tuple[int, HotColumns]:
+    """(max id, columns) of a user's rows dated on or after `first_date`."""
+    cursor.execute(
+        "SELECT id, CAST(julianday(date) - 2440587.5 AS INTEGER), type = 'Income', amount "
+        "FROM transactions WHERE user_id = ? AND date >= ?",
+        (user_id, first_date)
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return 0, HotColumns(np.zeros(0, np.int32), np.zeros(0), np.zeros(0, np.uint8))
+    ids, days, income, amounts = zip(*rows)
+    return max(ids), HotColumns(
+        np.array(days, dtype=np.int32),
+        np.array(amounts, dtype=np.float64),
+        np.where(np.array(income, dtype=bool), TYPE_CODES["Income"], TYPE_CODES["Expense"]).astype(np.uint8),
+    )
+
+
+def daily_from_columns(columns: HotColumns, since_day: int) -> DailyArrays:
+    """The same buckets fetch_daily_arrays reads from daily_totals, built from raw columns."""
+    keep = columns.day >= since_day
+    days, index = np.unique(columns.day[keep], return_inverse=True)
+    amount = columns.amount[keep]
+    income = columns.type[keep] == TYPE_CODES["Income"]
+    n = len(days)
+    return DailyArrays(
+        days.astype(np.int64),
+        np.bincount(index, weights=np.where(income, amount, 0.0), minlength=n),
+        np.bincount(index, weights=np.where(income, 0.0, amount), minlength=n),
+        np.bincount(index[income], minlength=n),
+        np.bincount(index[~income], minlength=n),
+    )
+
+
+class UserEntry:
+    """One user's rows dated on or after `first_day`, in growable columns (capacity doubles)."""
+
+    __slots__ = ("version", "max_id", "first_day", "size", "columns")
+
+    def __init__(self, version: int, max_id: int, first_day: int):
+        self.version = version
+        self.max_id = max_id
+        self.first_day = first_day
+        self.size = 0
+        self.columns = HotColumns(*(np.empty(0, dtype) for dtype in (np.int32, np.float64, np.uint8)))
+
+    def extend(self, columns: HotColumns) -> None:
+        need = self.size + len(columns.day)
+        if need > len(self.columns.day):
+            capacity = max(need, 2 * len(self.columns.day), MIN_CAPACITY)
+            grown = []
+            for old in self.columns:
+                new = np.empty(capacity, old.dtype)
+                new[:self.size] = old[:self.size]
+                grown.append(new)
+            self.columns = HotColumns(*grown)
+        for target, values in zip(self.columns, columns):
+            target[self.size:need] = values
+        self.size = need
+
+    def view(self) -> HotColumns:
+        # Appends only write past `size` or into fresh arrays, so this stays valid unlocked.
+        return HotColumns(*(column[:self.size] for column in self.columns))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns) + ENTRY_OVERHEAD_BYTES
+
+
+# --- HOT STORE ---
+class HotStore:
+    """
+    Recently active users' last HOT_WINDOW_DAYS of transactions in compact columns,
+    kept in LRU order under a byte budget, so the bucket metrics can be computed
+    without touching SQLite. A user whose rows would not fit the whole budget is
+    refused and remembered at that version, so callers go straight to daily_totals
+    instead of reloading raw rows on every read.
+
+    Entries are tagged with the user's response cache data version (cache.py), which
+    every writer bumps after committing. A read only hits at the current version. A
+    writer in this process appends its rows when the entry held exactly the data
+    before its bump: the version is one behind and every new id is above the entry's
+    highest. Anything else (a write from another worker, racing writers) drops the
+    entry, and the next read reloads it. Across workers that needs the shared
+    (sqlite) cache backend, like the response cache itself.
+    """
+
+    def __init__(self, budget_bytes: int = HOT_STORE_BYTES):
+        self.budget_bytes = budget_bytes
+        self._users: "OrderedDict[str, UserEntry]" = OrderedDict()
+        self._refused: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    @staticmethod
+    def window_start() -> str:
+        return (date.today() - timedelta(days=HOT_WINDOW_DAYS)).isoformat()
+
+    def _drop(self, user_id: str) -> None:
+        entry = self._users.pop(user_id, None)
+        if entry is not None:
+            self.bytes -= entry.nbytes
+
+    def _fit(self) -> None:
+        while self.bytes > self.budget_bytes and self._users:
+            _, entry = self._users.popitem(last=False)
+            self.bytes -= entry.nbytes
+            self.evictions += 1
+
+    def admits(self, user_id: str, version: int) -> bool:
+        """False when the user was refused at this version; a write makes them eligible again."""
+        with self._lock:
+            return self._refused.get(user_id) != version
+
+    def lookup(self, user_id: str, version: int, since_day: int) -> Optional[HotColumns]:
+        """The user's columns if held at `version` back to `since_day`; cheap enough for the event loop."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry.version != version or since_day < entry.first_day:
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry.view()
+
+    def put(self, user_id: str, version: int, first_date: str, loaded: Tuple[int, HotColumns]) -> bool:
+        """Store the result of load_hot_columns, read after `version` was. False if refused."""
+        max_id, columns = loaded
+        entry = UserEntry(version, max_id, day_of(first_date))
+        entry.extend(columns)
+        with self._lock:
+            self._drop(user_id)
+            if entry.nbytes > self.budget_bytes:
+                self._refused[user_id] = version
+                self._refused.move_to_end(user_id)
+                while len(self._refused) > MAX_REFUSED:
+                    self._refused.popitem(last=False)
+                return False
+            self._refused.pop(user_id, None)
+            self._users[user_id] = entry
+            self.bytes += entry.nbytes
+            self._fit()
+            return True
+
+    def append(self, user_id: str, version: int, rows: List[dict]) -> None:
+        """Rows (as transaction dicts) one writer just committed, with the version its bump returned."""
+        if not rows:
+            return
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry.version == version:
+                return   # absent, or loaded after this write and already holding it
+            if entry.version != version - 1 or min(row["id"] for row in rows) <= entry.max_id:
+                self._drop(user_id)
+                return
+            fresh = [row for row in rows if day_of(row["date"]) >= entry.first_day]
+            before = entry.nbytes
+            entry.extend(HotColumns(
+                np.array([day_of(row["date"]) for row in fresh], dtype=np.int32),
+                np.array([row["amount"] for row in fresh], dtype=np.float64),
+                np.array([TYPE_CODES[row["type"]] for row in fresh], dtype=np.uint8),
+            ))
+            entry.max_id = max(row["id"] for row in rows)
+            entry.version = version
+            self.bytes += entry.nbytes - before
+            self._fit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._refused.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = sum(entry.size for entry in self._users.values())
+            return {
+                "users": len(self._users),
+                "rows": rows,
+                "bytes": self.bytes,
+                "bytes_per_row": round(self.bytes / rows, 1) if rows else 0.0,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refused": len(self._refused),
+            }
+
+
+hot_store = HotStore()
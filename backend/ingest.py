@@ -0,0 +1,69 @@
+import os
+import json
+from typing import Any, AsyncIterator, List, Tuple
+
+# --- CONFIG ---
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+INSERT_CHUNK_ROWS = 500   # 6 bound values per row stays well under SQLite's variable limit
+
+TRANSACTION_COLUMNS = ("id", "date", "type", "category", "amount", "description", "user_id")
+INSERT_TRANSACTIONS = "INSERT INTO transactions (date, type, category, amount, description, user_id) VALUES "
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+def insert_transactions(cursor, rows: List[Tuple]) -> List[int]:
+    """
+    Insert rows (transactions INSERT tuple layout) with multi-row INSERT ... RETURNING,
+    one statement per INSERT_CHUNK_ROWS. Returns the new ids in input order; ids from
+    one statement are consecutive, so sorting them restores insertion order.
+    """
+    ids: List[int] = []
+    for lo in range(0, len(rows), INSERT_CHUNK_ROWS):
+        chunk = rows[lo:lo + INSERT_CHUNK_ROWS]
+        placeholders = ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk))
+        cursor.execute(
+            INSERT_TRANSACTIONS + placeholders + " RETURNING id",
+            [value for row in chunk for value in row]
+        )
+        ids.extend(sorted(r[0] for r in cursor.fetchall()))
+    return ids
+
+
+def transaction_dicts(ids: List[int], rows: List[Tuple]) -> List[dict]:
+    """Rows as returned by SELECT * on transactions, from insert_transactions ids and tuples."""
+    return [dict(zip(TRANSACTION_COLUMNS, (row_id, *row))) for row_id, row in zip(ids, rows)]
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_items: int = BATCH_MAX_ITEMS) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (index, parsed object) per non-blank NDJSON line as the body streams in.
+    Lines that are not valid JSON are yielded as a ValueError so the caller can report
+    them per item. Raises BatchTooLarge once more than `max_items` lines arrive.
+    """
+    buffer = b""
+    index = 0
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return ValueError(f"Invalid JSON: {e}")
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            if index >= max_items:
+                raise BatchTooLarge(f"Batch exceeds {max_items} items")
+            yield index, parse(line)
+            index += 1
+
+    if buffer.strip():
+        if index >= max_items:
+            raise BatchTooLarge(f"Batch exceeds {max_items} items")
+        yield index, parse(buffer)
@@ -0,0 +1,248 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+from aggregates import record_transactions
+from cache import response_cache
+from categorizer import get_matcher
+from database import get_db_connection
+from dedup import Deduplicator
+from hotstore import hot_store
+from ingest import insert_transactions, transaction_dicts
+from telemetry import span
+from statements import iter_statement, StatementFormatError, StatementTooLarge, MAX_STATEMENT_BYTES
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+JOBS_DIR = os.getenv("IMPORT_JOBS_DIR", "import_jobs")
+JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = 2.0
+MAX_REPORTED_REJECTS = 100
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def save_upload(raw: BinaryIO, max_bytes: int = MAX_STATEMENT_BYTES):
+    """Copy an upload into JOBS_DIR while hashing it. Returns (path, sha256, size)."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    path = os.path.join(JOBS_DIR, f"upload-{uuid.uuid4().hex}.csv")
+    try:
+        with open(path, "wb") as out:
+            while True:
+                block = raw.read(COPY_BUFFER_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise StatementTooLarge(f"Statement exceeds {max_bytes // (1024 * 1024)}MB limit")
+                digest.update(block)
+                out.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def job_view(job: Dict) -> Dict:
+    """Public progress view of a job row, with a throughput-based ETA."""
+    view = {k: job[k] for k in ("id", "user_id", "filename", "status", "rows_inserted", "rows_rejected",
+                                "rows_duplicate", "fuzzy_days", "error", "created_at", "started_at", "finished_at")}
+    view["rows_processed"] = job["rows_inserted"] + job["rows_rejected"] + job["rows_duplicate"]
+    view["rejects"] = json.loads(job["rejects"])
+    view["progress_pct"] = round(100 * job["bytes_processed"] / job["bytes_total"], 1) if job["bytes_total"] else 0.0
+
+    eta = None
+    if job["status"] == "running" and job["started_at"] and job["bytes_processed"]:
+        elapsed = (datetime.now() - datetime.fromisoformat(job["started_at"])).total_seconds()
+        remaining = job["bytes_total"] - job["bytes_processed"]
+        eta = round(elapsed * remaining / job["bytes_processed"], 1)
+    elif job["status"] == "done":
+        eta = 0.0
+    view["eta_seconds"] = eta
+    return view
+
+
+class ImportJobQueue:
+    """
+    SQLite-backed queue of statement imports processed by background threads.
+
+    Enqueueing is idempotent per (user, file hash): a retried upload returns the
+    existing job (re-queueing it if it had failed) instead of importing twice.
+    Rows already stored from other, overlapping statements are skipped by Deduplicator.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self.on_commit: Optional[Callable[[str, List[Dict]], None]] = None   # (user_id, new rows) per chunk
+
+    # --- producer side ---
+    def enqueue(self, raw: BinaryIO, filename: str, user_id: str, fuzzy_days: int = 0) -> Dict:
+        path, content_hash, size = save_upload(raw)
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                # Identical uploads racing each other: only one insert wins, the rest
+                # fall through to the existing row.
+                job_id = uuid.uuid4().hex
+                cursor.execute(
+                    "INSERT INTO import_jobs (id, user_id, content_hash, filename, path, status, bytes_total, fuzzy_days, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?) ON CONFLICT (user_id, content_hash) DO NOTHING",
+                    (job_id, user_id, content_hash, filename, path, size, fuzzy_days, _now())
+                )
+                if cursor.rowcount:
+                    conn.commit()
+                    self._wakeup.set()
+                    return {"job_id": job_id, "deduplicated": False}
+
+                cursor.execute("SELECT * FROM import_jobs WHERE user_id = ? AND content_hash = ?", (user_id, content_hash))
+                existing = cursor.fetchone()
+                if existing["status"] == "failed":
+                    cursor.execute(
+                        "UPDATE import_jobs SET status = 'queued', error = NULL, finished_at = NULL WHERE id = ?",
+                        (existing["id"],)
+                    )
+                conn.commit()
+        except Exception:
+            os.remove(path)
+            raise
+
+        os.remove(path)
+        if existing["status"] == "failed":
+            self._wakeup.set()
+        return {"job_id": existing["id"], "deduplicated": True}
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """The job row; with `user_id`, only if that user owns it."""
+        with get_db_connection() as conn:
+            if user_id is None:
+                row = conn.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+            else:
+                row = conn.execute("SELECT * FROM import_jobs WHERE id = ? AND user_id = ?", (job_id, user_id)).fetchone()
+        return dict(row) if row else None
+
+    # --- consumer side ---
+    def start(self) -> None:
+        if self._threads:
+            return
+        # Anything left 'running' belongs to a worker that died; its committed chunks
+        # are recorded in chunks_done, so it can simply be picked up again.
+        with get_db_connection() as conn:
+            conn.execute("UPDATE import_jobs SET status = 'queued' WHERE status = 'running'")
+            conn.commit()
+
+        self._stopping.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"import-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self) -> Optional[Dict]:
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "UPDATE import_jobs SET status = 'running', started_at = COALESCE(started_at, ?) "
+                "WHERE id = (SELECT id FROM import_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) "
+                "RETURNING *",
+                (_now(),)
+            ).fetchone()
+            conn.commit()
+        return dict(row) if row else None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(JOB_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                self.process(job)
+            except Exception as e:
+                if isinstance(e, StatementFormatError):
+                    logger.warning(f"Import job {job['id']} rejected: {e}")
+                else:
+                    logger.error(f"Import job {job['id']} failed: {e}", exc_info=True)
+                self._fail(job["id"], str(e))
+
+    def _fail(self, job_id: str, error: str) -> None:
+        with get_db_connection() as conn:
+            conn.execute(
+                "UPDATE import_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, _now(), job_id)
+            )
+            conn.commit()
+
+    def process(self, job: Dict) -> None:
+        user_id = job["user_id"]
+        rejects = json.loads(job["rejects"])
+
+        with open(job["path"], "rb") as f, get_db_connection() as conn:
+            cursor = conn.cursor()
+            matcher = get_matcher(cursor, user_id)
+            dedup = Deduplicator(cursor, user_id, job["fuzzy_days"])
+            for chunk_no, (rows, chunk_rejects) in enumerate(iter_statement(f, user_id, matcher)):
+                # Committed chunks are still passed through the deduplicator so it
+                # claims the rows they stored, exactly as the first run did.
+                with span("import.dedup"):
+                    rows, duplicates = dedup.filter(rows)
+                if chunk_no < job["chunks_done"]:
+                    continue   # committed before a restart
+                if self._stopping.is_set():
+                    cursor.execute("UPDATE import_jobs SET status = 'queued' WHERE id = ?", (job["id"],))
+                    conn.commit()
+                    return
+
+                rejects.extend(chunk_rejects[:MAX_REPORTED_REJECTS - len(rejects)])
+                with span("import.store_chunk"):
+                    ids = []
+                    if rows:
+                        ids = insert_transactions(cursor, rows)
+                        dedup.claim(ids)
+                        record_transactions(cursor, rows)
+                    cursor.execute(
+                        "UPDATE import_jobs SET chunks_done = ?, bytes_processed = ?, rows_inserted = rows_inserted + ?, "
+                        "rows_rejected = rows_rejected + ?, rows_duplicate = rows_duplicate + ?, rejects = ? WHERE id = ?",
+                        (chunk_no + 1, min(f.tell(), job["bytes_total"]), len(rows), len(chunk_rejects), duplicates,
+                         json.dumps(rejects), job["id"])
+                    )
+                    conn.commit()
+                if rows:
+                    stored = transaction_dicts(ids, rows)
+                    hot_store.append(user_id, response_cache.bump_version(user_id), stored)
+                    if self.on_commit:
+                        self.on_commit(user_id, stored)
+
+            cursor.execute("SELECT rows_inserted + rows_duplicate FROM import_jobs WHERE id = ?", (job["id"],))
+            valid = cursor.fetchone()[0]
+            status, error = ("done", None) if valid else ("failed", "No valid transactions")
+            cursor.execute(
+                "UPDATE import_jobs SET status = ?, error = ?, bytes_processed = bytes_total, finished_at = ? WHERE id = ?",
+                (status, error, _now(), job["id"])
+            )
+            conn.commit()
+
+        if status == "done":
+            os.remove(job["path"])
+
+
+job_queue = ImportJobQueue()
@@ -5,23 +5,23 @@ from datetime import datetime, timedelta
 
 fake = Faker()
 
-def generate_student_gig_data(months=12):
+def generate_student_gig_rows(months=12, rng=random, end_date=None):
     data = []
-    # Start the data from 1 year ago
-    start_date = datetime.now() - timedelta(days=months*30)
-    
+    # Start the data `months` before end_date (default: today)
+    start_date = (end_date or datetime.now()) - timedelta(days=months*30)
+
     for i in range(months * 30):
         current_date = start_date + timedelta(days=i)
-        
+
         # 1. SIMULATE INCOME (The "Lumpy" Signal)
         # 5% chance of getting a freelance payment on any given day
-        if random.random() < 0.05: 
+        if rng.random() < 0.05:
             data.append({
                 "date": current_date.strftime("%Y-%m-%d"),
                 "category": "Freelance",
                 "type": "Income",
-                "amount": random.choice([4000, 7500, 12000, 18000]),
-                "description": random.choice(["Video Edit", "Logo Design", "Web Bug Fix", "Social Media Mgmt"])
+                "amount": rng.choice([4000, 7500, 12000, 18000]),
+                "description": rng.choice(["Video Edit", "Logo Design", "Web Bug Fix", "Social Media Mgmt"])
             })
 
         # 2. SIMULATE FIXED EXPENSES
@@ -37,19 +37,37 @@ def generate_student_gig_data(months=12):
 
         # 3. SIMULATE VARIABLE EXPENSES (The "Noise")
         # 70% chance of spending small amounts daily
-        if random.random() < 0.7:
+        if rng.random() < 0.7:
             data.append({
                 "date": current_date.strftime("%Y-%m-%d"),
                 "category": "Lifestyle",
                 "type": "Expense",
-                "amount": random.randint(40, 600),
-                "description": random.choice(["Tea/Coffee", "Zomato", "Auto Rickshaw", "Stationery", "Movie"])
+                "amount": rng.randint(40, 600),
+                "description": rng.choice(["Tea/Coffee", "Zomato", "Auto Rickshaw", "Stationery", "Movie"])
             })
 
-    df = pd.DataFrame(data)
+    return data
+
+def generate_multi_user_data(users=10, months=36, seed=42, daily_events=1):
+    """
+    Histories for `users` synthetic students, `months` long each. `daily_events`
+    replays the generator that many times per user to simulate heavier spenders.
+    Returns {user_id: [row, ...]}.
+    """
+    rng = random.Random(seed)
+    histories = {}
+    for n in range(users):
+        rows = []
+        for _ in range(daily_events):
+            rows.extend(generate_student_gig_rows(months, rng))
+        histories[f"bench-user-{n:04d}"] = rows
+    return histories
+
+def generate_student_gig_data(months=12):
+    df = pd.DataFrame(generate_student_gig_rows(months))
     # Save the file in the backend folder
     df.to_csv("synthetic_transactions.csv", index=False)
     print(f"✅ Success! Generated {len(df)} transactions in 'synthetic_transactions.csv'")
 
 if __name__ == "__main__":
-    generate_student_gig_data()
\ No newline at end of file
+    generate_student_gig_data()
@@ -0,0 +1,168 @@
+import io
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from telemetry import span
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# --- TESSERACT (Windows only) ---
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe' if os.name == 'nt' else None
+
+# --- CONFIG ---
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", str(OCR_WORKERS * 4)))
+OCR_TIMEOUT_SECONDS = float(os.getenv("OCR_TIMEOUT_SECONDS", "20"))
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "512"))
+OCR_MAX_SIDE = 1600   # receipts stay legible well below phone-camera resolution
+
+AMOUNT_PATTERN = re.compile(r'(?:₹|INR|RS|Rs\.?)\s?(\d+(?:,\d{3})*(?:\.\d{1,2})?)', re.I)
+
+
+class OCRBusy(Exception):
+    pass
+
+
+def prepare_image(content: bytes) -> "Image.Image":
+    """Grayscale and cap the long side; tesseract time grows with pixel count."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(content))
+    img = img.convert("L")
+    img.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE))
+    return img
+
+def recognize_amount(content: bytes) -> float:
+    """
+    Runs inside a pool worker process, which is the only place PIL and pytesseract get
+    imported (pytesseract pulls in pandas when it is installed).
+    """
+    import pytesseract
+
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    text = pytesseract.image_to_string(prepare_image(content))
+    match = AMOUNT_PATTERN.search(text)
+    return float(match.group(1).replace(',', '')) if match else 0.0
+
+
+class OCRPool:
+    """
+    Bounded process pool for receipt OCR.
+
+    At most `max_pending` jobs may be queued or running; beyond that `recognize`
+    raises OCRBusy immediately. A slot is released when its job finishes, or when a
+    job times out while running: the worker may be stuck in tesseract for good, so the
+    whole executor is replaced, its processes terminated, and every job it still held
+    is abandoned (those callers get an error). Results are cached by content hash.
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS, max_pending: int = OCR_MAX_PENDING,
+                 timeout: float = OCR_TIMEOUT_SECONDS, cache_size: int = OCR_CACHE_SIZE,
+                 worker_fn: Callable[[bytes], float] = recognize_amount):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.worker_fn = worker_fn
+        self.recycled = 0
+        self._executor: Optional["ProcessPoolExecutor"] = None
+        self._inflight: Dict[Future, "ProcessPoolExecutor"] = {}
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    def _current_executor(self) -> "ProcessPoolExecutor":
+        """Call with the lock held."""
+        if self._executor is None:
+            # spawn, not fork: by the time OCR runs the API process has DB, compute,
+            # import and scheduler threads, and a forked child can inherit their held locks.
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def start(self) -> None:
+        with self._lock:
+            self._current_executor()
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._inflight.pop(future, None)
+
+    def _recycle(self, executor: "ProcessPoolExecutor") -> None:
+        """Replace `executor` (if still current), free its slots and kill its workers."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            abandoned = [f for f, owner in self._inflight.items() if owner is executor]
+            for future in abandoned:
+                del self._inflight[future]
+            self.recycled += 1
+        logger.warning(f"OCR job timed out; replacing the pool and abandoning {len(abandoned)} job(s)")
+        _terminate(executor)
+
+    async def recognize(self, content: bytes) -> float:
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+            if len(self._inflight) >= self.max_pending:
+                raise OCRBusy(f"OCR queue full ({self.max_pending} jobs)")
+            executor = self._current_executor()
+            future = executor.submit(self.worker_fn, content)
+            self._inflight[future] = executor
+        future.add_done_callback(self._release)
+
+        try:
+            with span("ocr.recognize"):
+                amount = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():   # it started, and its worker may never come back
+                self._recycle(executor)
+            raise
+
+        with self._lock:
+            self._cache[digest] = amount
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "pending": len(self._inflight), "max_pending": self.max_pending,
+                    "cached": len(self._cache), "recycled": self.recycled}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._inflight.clear()
+        if executor is not None:
+            _terminate(executor)
+
+
+def _terminate(executor: "ProcessPoolExecutor") -> None:
+    # shutdown() alone waits for running jobs to end, which a stuck worker never does.
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+ocr_pool = OCRPool()
@@ -0,0 +1,246 @@
+import os
+import queue
+import asyncio
+import logging
+import sqlite3
+import threading
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from aggregates import DailyArrays, fetch_daily_arrays, record_transactions
+from cache import response_cache
+from categorizer import get_matcher
+from database import open_connection
+from history import fetch_recent_transactions
+from hotstore import hot_store, load_hot_columns, daily_from_columns, day_of
+from snapshots import fetch_prev_net_30
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+DB_READ_THREADS = int(os.getenv("DB_READ_THREADS", "4"))
+COMPUTE_THREADS = int(os.getenv("COMPUTE_THREADS", str(min(os.cpu_count() or 1, 8))))
+
+T = TypeVar("T")
+
+
+# --- REPOSITORY ---
+class Repository(ABC):
+    """
+    Async storage for the request handlers. A backend only provides `execute`, which
+    runs a unit of work against a connection somewhere off the event loop; the query
+    methods are built on it. Each unit of work is one connection checkout, so the
+    reads a response needs stay together. Work that writes must say so.
+    """
+
+    @abstractmethod
+    async def execute(self, work: Callable[[sqlite3.Connection], T], write: bool = False) -> T: ...
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> Dict: ...
+
+    async def hot_daily_arrays(self, user_id: str, since: str) -> Optional[DailyArrays]:
+        """
+        Buckets from the hot store (hotstore.py), loading the user's recent rows into it
+        on a miss. None when the store is off, `since` reaches past what it holds, or the
+        user was refused; callers then read daily_totals as before. The NumPy work runs on
+        a compute or DB thread, never on the event loop.
+        """
+        first_date = hot_store.window_start()
+        if not hot_store.enabled or since < first_date:
+            return None
+        version = await response_cache.data_version_async(user_id)
+        if not hot_store.admits(user_id, version):
+            return None
+        since_day = day_of(since)
+        columns = hot_store.lookup(user_id, version, since_day)
+        if columns is not None:
+            return await run_compute(daily_from_columns, columns, since_day)
+        def work(conn):
+            with span("db.hot_columns"):
+                loaded = load_hot_columns(conn.cursor(), user_id, first_date)
+            hot_store.put(user_id, version, first_date, loaded)
+            return daily_from_columns(loaded[1], since_day)
+        return await self.execute(work)
+
+    async def daily_arrays(self, user_id: str, since: str) -> DailyArrays:
+        daily = await self.hot_daily_arrays(user_id, since)
+        if daily is not None:
+            return daily
+        def work(conn):
+            with span("db.daily_totals"):
+                return fetch_daily_arrays(conn.cursor(), user_id, since)
+        return await self.execute(work)
+
+    async def budget_inputs(self, user_id: str, since: str, now: datetime) -> Tuple[DailyArrays, Optional[float]]:
+        """
+        Daily buckets since `since` plus the stored previous-30-day net, if any. From the
+        hot store the net is left to calculate_metrics, which derives it from the buckets.
+        """
+        daily = await self.hot_daily_arrays(user_id, since)
+        if daily is not None:
+            return daily, None
+        def work(conn):
+            with span("db.daily_totals"):
+                cursor = conn.cursor()
+                return fetch_daily_arrays(cursor, user_id, since), fetch_prev_net_30(cursor, user_id, now)
+        return await self.execute(work)
+
+    async def dashboard_inputs(self, user_id: str, since: str, now: datetime) -> Tuple[DailyArrays, Optional[float], List[dict]]:
+        # Recent rows need a DB round trip anyway, and the bucket read rides along in the
+        # same one; going through the hot store here would only add a second hop.
+        def work(conn):
+            with span("db.dashboard"):
+                cursor = conn.cursor()
+                return (fetch_daily_arrays(cursor, user_id, since), fetch_prev_net_30(cursor, user_id, now),
+                        fetch_recent_transactions(cursor, user_id))
+        return await self.execute(work)
+
+    async def recent_transactions(self, user_id: str) -> List[dict]:
+        return await self.execute(lambda conn: fetch_recent_transactions(conn.cursor(), user_id))
+
+    async def insert_transaction(self, date_str: str, type: str, category: Optional[str], amount: float,
+                                 description: str, user_id: str) -> dict:
+        """Categorize (unless `category` is given), insert and fold into daily_totals; returns the new row."""
+        def work(conn):
+            with span("db.insert_transaction"):
+                cursor = conn.cursor()
+                row = (date_str, type, category or get_matcher(cursor, user_id).match(description),
+                       amount, description, user_id)
+                cursor.execute(
+                    "INSERT INTO transactions (date, type, category, amount, description, user_id) VALUES (?, ?, ?, ?, ?, ?) RETURNING *",
+                    row
+                )
+                new_row = dict(cursor.fetchone())
+                record_transactions(cursor, [row])
+                conn.commit()
+                return new_row
+        return await self.execute(work, write=True)
+
+
+def _settle(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class ThreadedRepository(Repository):
+    """
+    DB threads that each own one connection, fed from request queues: `readers`
+    threads share the read queue and a single writer thread takes the writes.
+
+    A burst of requests waits in the queues instead of holding threadpool workers,
+    and no connections are opened or closed under load. sqlite3 releases the GIL
+    while a statement runs, so readers overlap under WAL; writes are serialized by
+    SQLite anyway, and with one writer they wait in the queue rather than on the
+    database lock, never in front of reads. Threads start on first use.
+
+    Every write made while serving a request (single and batch inserts, category
+    rules) goes through the writer. The background import workers (jobs.py) and the
+    nightly snapshot and archive runs keep their own connections: their long chunked
+    transactions would otherwise sit in the queue ahead of interactive writes, and
+    they still take SQLite's write lock, waiting on busy_timeout like any writer.
+    """
+
+    def __init__(self, readers: int = DB_READ_THREADS):
+        self.readers = readers
+        self._reads: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writes: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._workers: List[Tuple[threading.Thread, "queue.SimpleQueue"]] = []
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            queues = [(f"db-read-{n}", self._reads) for n in range(self.readers)] + [("db-write", self._writes)]
+            for name, requests in queues:
+                worker = threading.Thread(target=self._serve, args=(requests,), name=name, daemon=True)
+                worker.start()
+                self._workers.append((worker, requests))
+
+    def _serve(self, requests: "queue.SimpleQueue") -> None:
+        conn = open_connection()
+        try:
+            while True:
+                request = requests.get()
+                if request is None:
+                    return
+                work, future, loop = request
+                if future.cancelled():   # the client went away while this waited
+                    continue
+                try:
+                    result, error = work(conn), None
+                except Exception as e:
+                    result, error = None, e
+                if conn.in_transaction:
+                    conn.rollback()
+                try:
+                    loop.call_soon_threadsafe(_settle, future, result, error)
+                except RuntimeError:
+                    pass   # the loop closed while the work ran
+        finally:
+            conn.close()
+
+    async def execute(self, work, write=False):
+        if not self._workers:
+            self._start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        (self._writes if write else self._reads).put((work, future, loop))
+        return await future
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _, requests in workers:
+            requests.put(None)
+        for worker, _ in workers:
+            worker.join(timeout=5)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": type(self).__name__,
+            "threads": len(self._workers),
+            "queued_reads": self._reads.qsize(),
+            "queued_writes": self._writes.qsize(),
+        }
+
+
+repository: Repository = ThreadedRepository()
+
+
+# --- COMPUTE OFFLOAD ---
+# CPU-bound work (NumPy kernels, simulations) runs here rather than on the event loop
+# or in the DB threads, so a slow computation never holds up queries behind it.
+_compute_executor: Optional[ThreadPoolExecutor] = None
+_compute_lock = threading.Lock()
+
+def _get_compute_executor() -> ThreadPoolExecutor:
+    global _compute_executor
+    with _compute_lock:
+        if _compute_executor is None:
+            _compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_THREADS, thread_name_prefix="compute")
+        return _compute_executor
+
+async def run_compute(fn: Callable[..., T], *args, **kwargs) -> T:
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_compute_executor(), functools.partial(fn, *args, **kwargs))
+
+def shutdown() -> None:
+    global _compute_executor
+    repository.close()
+    with _compute_lock:
+        if _compute_executor is not None:
+            _compute_executor.shutdown(wait=False, cancel_futures=True)
+            _compute_executor = None
@@ -0,0 +1,65 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, Query, HTTPException, Header
+from cache import response_cache
+from repository import repository
+from hotstore import hot_store
+from telemetry import registry, Gauge, profiler, set_enabled, state as telemetry_state
+
+router = APIRouter(prefix="/api/v1")
+
+# Debug endpoints (telemetry switch, profiler) need X-Admin-Token; unset disables them.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+registry.register(Gauge("bufferzen_cache_hits_total", "Response cache hits.",
+                        lambda: response_cache.hits, kind="counter"))
+registry.register(Gauge("bufferzen_cache_misses_total", "Response cache misses.",
+                        lambda: response_cache.misses, kind="counter"))
+registry.register(Gauge("bufferzen_db_queued_requests", "Repository requests waiting for a DB thread.",
+                        lambda: {(kind,): repository.stats()[f"queued_{kind}s"] for kind in ("read", "write")},
+                        labels=("queue",)))
+registry.register(Gauge("bufferzen_hot_store_bytes", "Bytes held by the in-process hot store.",
+                        lambda: hot_store.bytes))
+registry.register(Gauge("bufferzen_hot_store_hits_total", "Hot store reads served from memory.",
+                        lambda: hot_store.hits, kind="counter"))
+registry.register(Gauge("bufferzen_hot_store_misses_total", "Hot store reads that loaded from SQLite.",
+                        lambda: hot_store.misses, kind="counter"))
+
+# --- API ENDPOINTS ---
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    return {"success": True, "data": {**response_cache.stats(), "hot_store": hot_store.stats()}}
+
+def require_admin(x_admin_token: Optional[str]) -> None:
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("/debug/telemetry")
+def get_telemetry_status(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return {"success": True, "data": {"enabled": telemetry_state.enabled, "profiler": profiler.report(limit=0)}}
+
+@router.post("/debug/telemetry")
+def set_telemetry(enabled: bool, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    set_enabled(enabled)
+    return {"success": True, "data": {"enabled": enabled}}
+
+@router.post("/debug/profiler/start")
+def start_profiler(
+    interval_ms: float = Query(5, ge=1, le=1000),
+    max_seconds: float = Query(60, gt=0, le=300),
+    x_admin_token: Optional[str] = Header(None)
+):
+    require_admin(x_admin_token)
+    if not profiler.start(interval_ms / 1000, max_seconds):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return {"success": True}
+
+@router.post("/debug/profiler/stop")
+def stop_profiler(limit: int = Query(50, ge=1, le=1000), x_admin_token: Optional[str] = Header(None)):
+    """Stop sampling and return the hottest functions plus collapsed stacks for a flamegraph."""
+    require_admin(x_admin_token)
+    profiler.stop()
+    return {"success": True, "data": profiler.report(limit)}
@@ -0,0 +1,375 @@
+import calendar
+import logging
+from datetime import datetime, timedelta, date as date_type
+from typing import Dict, Optional
+from fastapi import APIRouter, Query, HTTPException
+from pydantic import BaseModel, Field
+from aggregates import fetch_daily_arrays, day_number
+from calculations import EMPTY_METRICS, calculate_metrics, calculate_analytics
+from database import get_db_connection
+from cache import response_cache
+from history import fetch_recent_transactions
+from stress import load_daily_history, simulate_survival
+from goals import load_goal_history, project_goal, MAX_HORIZON_DAYS
+from spending import load_category_spend, category_analytics, lead_days, TREND_WINDOWS, MAX_RANGE_DAYS, MAX_TREND_WINDOW
+from archive import ArchiveUnavailable
+from snapshots import snapshot_scheduler, fetch_prev_net_30, fetch_trend, SNAPSHOT_SCHEDULE
+from repository import repository, run_compute
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+# --- PYDANTIC MODELS ---
+class StressRequest(BaseModel):
+    user_id: str = Field(..., min_length=1)
+    investments: float = Field(0, ge=0)
+    paths: int = Field(10000, ge=100, le=50000)
+    horizon_days: int = Field(365, ge=7, le=1095)
+    job_loss: bool = False
+    market_crash: float = Field(0, ge=0, le=1)   # mean drawdown on investments
+    inflation: float = Field(0, ge=0, le=1)      # annual rate applied to spend
+    seed: Optional[int] = None
+
+class GoalProjectionRequest(BaseModel):
+    user_id: str = Field(..., min_length=1)
+    target_amount: float = Field(..., gt=0, le=1e9)
+    deadline: date_type
+    current_savings: float = Field(0, ge=0)
+    max_cut: float = Field(0.5, gt=0, le=1)       # largest cut to non-fixed spend on the grid
+    cut_steps: int = Field(50, ge=2, le=100)
+    deadline_steps: int = Field(50, ge=2, le=100)
+    paths: int = Field(2000, ge=100, le=20000)
+    seed: Optional[int] = None
+
+# --- CORE CALCULATION ENGINE ---
+# calculate_metrics / calculate_analytics live in calculations.py (NumPy over daily buckets).
+
+def calculate_metrics_from_rows(df_data: list, fixed_costs: float) -> Dict:
+    """Reference pandas implementation over raw rows, kept for consistency checks."""
+    if not df_data:
+        return dict(EMPTY_METRICS)
+    
+    import pandas as pd   # only this diagnostic path and CSV imports need pandas
+    
+    df = pd.DataFrame(df_data)
+    df['date'] = pd.to_datetime(df['date'])
+    
+    income_total = df[df['type'] == 'Income']['amount'].sum()
+    expense_total = df[df['type'] == 'Expense']['amount'].sum()
+    current_balance = income_total - expense_total
+    
+    expenses_df = df[df['type'] == 'Expense']
+    
+    if not expenses_df.empty:
+        date_range = (expenses_df['date'].max() - expenses_df['date'].min()).days + 1
+        daily_avg = expense_total / max(date_range, 1)
+        
+        seven_days_ago = datetime.now() - timedelta(days=7)
+        fourteen_days_ago = datetime.now() - timedelta(days=14)
+        
+        last_week = expenses_df[expenses_df['date'] >= seven_days_ago]['amount'].sum()
+        prev_week = expenses_df[
+            (expenses_df['date'] >= fourteen_days_ago) & 
+            (expenses_df['date'] < seven_days_ago)
+        ]['amount'].sum()
+        
+        burn_rate = ((last_week - prev_week) / prev_week * 100) if prev_week > 0 else 0
+    else:
+        daily_avg = 0
+        burn_rate = 0
+    
+    monthly_income = df[df['type'] == 'Income']\
+        .groupby(pd.Grouper(key='date', freq='ME'))['amount']\
+        .sum()
+    
+    avg_monthly_income = monthly_income.mean() if not monthly_income.empty else 0
+    income_volatility = monthly_income.std() if not monthly_income.empty else 0
+    
+    cv = (income_volatility / avg_monthly_income) if avg_monthly_income > 0 else 0
+    volatility_score = "High" if cv > 0.3 else "Low"
+    
+    days_in_month = calendar.monthrange(datetime.now().year, datetime.now().month)[1]
+    
+    disposable = current_balance - fixed_costs
+    daily_safe_limit = max(0, disposable / days_in_month)
+    
+    daily_fixed_burn = fixed_costs / days_in_month
+    survival_days = (current_balance / daily_fixed_burn) if daily_fixed_burn > 0 and current_balance > 0 else 0
+    
+    resilience_score = int(min(100, (survival_days * 2) + (20 if current_balance > fixed_costs else 0)))
+    
+    # --- MOMENTUM CALCULATIONS (Last 30 days vs Previous 30 days) ---
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    sixty_days_ago = datetime.now() - timedelta(days=60)
+    
+    # Current 30 days stats
+    current_30_df = df[df['date'] >= thirty_days_ago]
+    current_income = current_30_df[current_30_df['type'] == 'Income']['amount'].sum()
+    current_expense = current_30_df[current_30_df['type'] == 'Expense']['amount'].sum()
+    current_bal_30 = current_income - current_expense
+    current_limit_30 = max(0, (current_bal_30 - fixed_costs) / days_in_month)
+    current_horizon_30 = (current_bal_30 / daily_fixed_burn) if daily_fixed_burn > 0 and current_bal_30 > 0 else 0
+    current_resilience_30 = int(min(100, (current_horizon_30 * 2) + (20 if current_bal_30 > fixed_costs else 0)))
+    
+    # Previous 30 days stats
+    prev_30_df = df[(df['date'] >= sixty_days_ago) & (df['date'] < thirty_days_ago)]
+    prev_income = prev_30_df[prev_30_df['type'] == 'Income']['amount'].sum()
+    prev_expense = prev_30_df[prev_30_df['type'] == 'Expense']['amount'].sum()
+    prev_bal_30 = prev_income - prev_expense
+    prev_limit_30 = max(0, (prev_bal_30 - fixed_costs) / days_in_month)
+    prev_horizon_30 = (prev_bal_30 / daily_fixed_burn) if daily_fixed_burn > 0 and prev_bal_30 > 0 else 0
+    prev_resilience_30 = int(min(100, (prev_horizon_30 * 2) + (20 if prev_bal_30 > fixed_costs else 0)))
+    
+    # Deltas
+    limit_change_pct = ((current_limit_30 - prev_limit_30) / prev_limit_30 * 100) if prev_limit_30 > 0 else (100.0 if current_limit_30 > 0 else 0.0)
+    horizon_change = int(current_horizon_30 - prev_horizon_30)
+    resilience_change_pct = ((current_resilience_30 - prev_resilience_30) / prev_resilience_30 * 100) if prev_resilience_30 > 0 else (100.0 if current_resilience_30 > 0 else 0.0)
+
+    
+    return {
+        "daily_limit": round(daily_safe_limit, 2),
+        "survival_horizon": int(survival_days),
+        "current_balance": round(current_balance, 2),
+        "daily_avg": round(daily_avg, 2),
+        "burn_rate": round(burn_rate, 1),
+        "resilience_score": max(0, resilience_score),
+        "volatility_score": volatility_score,
+        "monthly_avg": round(avg_monthly_income, 2),
+        "limit_change_pct": round(limit_change_pct, 1),
+        "horizon_change": horizon_change,
+        "resilience_change_pct": round(resilience_change_pct, 1)
+    }
+
+def check_metrics_consistency(user_id: str, fixed_costs: float, tolerance: float = 0.01) -> Dict:
+    """
+    Compare the aggregate-backed metrics against the pandas reference path for one user.
+    Returns both results plus the list of fields that disagree beyond `tolerance`.
+    """
+    six_months_ago = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
+    with get_db_connection() as conn, span("db.consistency_rows"):
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM transactions WHERE user_id = ? AND date >= ? ORDER BY date DESC",
+            (user_id, six_months_ago)
+        )
+        rows = [dict(r) for r in cursor.fetchall()]
+        daily = fetch_daily_arrays(cursor, user_id, six_months_ago)
+
+    with span("calc.metrics"):
+        aggregate = calculate_metrics(daily, fixed_costs)
+    with span("calc.metrics_from_rows"):
+        reference = calculate_metrics_from_rows(rows, fixed_costs)
+
+    mismatches = []
+    for key, expected in reference.items():
+        actual = aggregate.get(key)
+        if isinstance(expected, str) or isinstance(actual, str):
+            equal = expected == actual
+        else:
+            equal = abs(float(actual) - float(expected)) <= tolerance
+        if not equal:
+            mismatches.append({"field": key, "aggregate": actual, "reference": expected})
+
+    return {"consistent": not mismatches, "mismatches": mismatches, "aggregate": aggregate, "reference": reference}
+
+def dashboard_from(daily, prev_net_30: Optional[float], recent: list, fixed_costs: float, now: datetime) -> Dict:
+    with span("calc.metrics"):
+        budget = calculate_metrics(daily, fixed_costs, now, prev_net_30)
+    with span("calc.analytics"):
+        analytics = calculate_analytics(daily.since(int(day_number(now)) - 30), now)
+    return {"budget": budget, "analytics": analytics, "recent": recent}
+
+async def load_dashboard_async(user_id: str, fixed_costs: float) -> Dict:
+    now = datetime.now()
+    six_months_ago = (now - timedelta(days=180)).strftime("%Y-%m-%d")
+    daily, prev_net_30, recent = await repository.dashboard_inputs(user_id, six_months_ago, now)
+    return await run_compute(dashboard_from, daily, prev_net_30, recent, fixed_costs, now)
+
+async def cached_dashboard(user_id: str, fixed_costs: float) -> Dict:
+    today = datetime.now().strftime("%Y-%m-%d")
+    return await response_cache.get_or_compute_async(
+        "dashboard", user_id, (fixed_costs, today), lambda: load_dashboard_async(user_id, fixed_costs))
+
+def startup() -> None:
+    if SNAPSHOT_SCHEDULE:
+        snapshot_scheduler.start()
+
+def shutdown() -> None:
+    snapshot_scheduler.stop()
+
+# --- API ENDPOINTS ---
+# The hot read paths are async: queries go through the repository's DB threads and
+# computation through run_compute, so neither holds a threadpool worker while it
+# waits and no NumPy work runs on the event loop.
+
+@router.get("/budget")
+async def get_budget(
+    user_id: str = Query(..., min_length=1),
+    fixed_costs: float = Query(..., ge=0, le=1000000)
+):
+    async def compute():
+        now = datetime.now()
+        six_months_ago = (now - timedelta(days=180)).strftime("%Y-%m-%d")
+        daily, prev_net_30 = await repository.budget_inputs(user_id, six_months_ago, now)
+        with span("calc.metrics"):
+            return await run_compute(calculate_metrics, daily, fixed_costs, now, prev_net_30)
+    
+    try:
+        today = datetime.now().strftime("%Y-%m-%d")
+        data = await response_cache.get_or_compute_async("budget", user_id, (fixed_costs, today), compute)
+        return {"success": True, "data": data}
+        
+    except Exception as e:
+        logger.error(f"Budget calculation error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to calculate budget")
+
+@router.get("/budget/consistency")
+def get_budget_consistency(
+    user_id: str = Query(..., min_length=1),
+    fixed_costs: float = Query(..., ge=0, le=1000000)
+):
+    try:
+        return {"success": True, "data": check_metrics_consistency(user_id, fixed_costs)}
+    except Exception as e:
+        logger.error(f"Consistency check error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to run consistency check")
+
+@router.get("/analytics")
+async def get_analytics(user_id: str = Query(..., min_length=1)):
+    async def compute():
+        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        daily = await repository.daily_arrays(user_id, thirty_days_ago)
+        with span("calc.analytics"):
+            return await run_compute(calculate_analytics, daily)
+    
+    try:
+        today = datetime.now().strftime("%Y-%m-%d")
+        return {"success": True, **await response_cache.get_or_compute_async("analytics", user_id, (today,), compute)}
+        
+    except Exception as e:
+        logger.error(f"Analytics error: {e}", exc_info=True)
+        return {"success": False, "labels": [], "values": [], "stats": {"daily_avg": 0, "burn_rate": 0}}
+
+@router.get("/analytics/categories")
+async def get_category_analytics(
+    user_id: str = Query(..., min_length=1),
+    start: Optional[date_type] = None,
+    end: Optional[date_type] = None,
+    windows: str = Query(",".join(map(str, TREND_WINDOWS)), max_length=64)
+):
+    """Per-category daily/weekly/monthly rolling spend, fixed vs variable burn and trend slopes."""
+    end = end or date_type.today()
+    start = start or end - timedelta(days=89)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be at most {MAX_RANGE_DAYS} days")
+    try:
+        trend_windows = tuple(sorted({int(w) for w in windows.split(",") if w.strip()}))
+    except ValueError:
+        trend_windows = ()
+    if not trend_windows or not all(2 <= w <= MAX_TREND_WINDOW for w in trend_windows):
+        raise HTTPException(status_code=400, detail=f"windows must be comma-separated day counts from 2 to {MAX_TREND_WINDOW}")
+
+    async def compute():
+        date_from = (start - timedelta(days=lead_days(trend_windows))).isoformat()
+        with span("db.category_spend"):
+            days, categories, amounts = await repository.execute(
+                lambda conn: load_category_spend(conn.cursor(), user_id, date_from, end.isoformat()))
+        with span("calc.category_analytics"):
+            return await run_compute(category_analytics, days, categories, amounts, start, end, trend_windows)
+
+    try:
+        params = (start.isoformat(), end.isoformat(), trend_windows)
+        data = await response_cache.get_or_compute_async("categories", user_id, params, compute)
+        return {"success": True, "data": data}
+    except ArchiveUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        logger.error(f"Category analytics error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to load category analytics")
+
+@router.get("/trends")
+def get_trends(
+    user_id: str = Query(..., min_length=1),
+    fixed_costs: float = Query(..., ge=0, le=1000000),
+    days: int = Query(90, ge=1, le=365)
+):
+    """Daily metric history from the nightly snapshots (see snapshots.py)."""
+    try:
+        since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        with get_db_connection() as conn:
+            return {"success": True, "data": fetch_trend(conn.cursor(), user_id, fixed_costs, since)}
+    except Exception as e:
+        logger.error(f"Trends error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to load trends")
+
+@router.get("/dashboard")
+async def get_dashboard(
+    user_id: str = Query(..., min_length=1),
+    fixed_costs: float = Query(..., ge=0, le=1000000)
+):
+    """Budget, 7-day analytics and recent history from one connection and one aggregate scan."""
+    try:
+        data = await cached_dashboard(user_id, fixed_costs)
+        return {"success": True, "data": data}
+        
+    except Exception as e:
+        logger.error(f"Dashboard error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to load dashboard")
+
+@router.post("/stress")
+async def run_stress_test(req: StressRequest):
+    try:
+        with span("db.daily_history"):
+            daily_income, daily_expense, balance = await repository.execute(
+                lambda conn: load_daily_history(conn.cursor(), req.user_id))
+        
+        with span("calc.stress"):
+            data = await run_compute(
+                simulate_survival,
+                daily_income, daily_expense, balance,
+                investments=req.investments,
+                paths=req.paths,
+                horizon_days=req.horizon_days,
+                job_loss=req.job_loss,
+                market_crash=req.market_crash,
+                inflation=req.inflation,
+                seed=req.seed
+            )
+        return {"success": True, "data": data}
+    except Exception as e:
+        logger.error(f"Stress test error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to run stress test")
+
+@router.post("/goals/project")
+async def project_goal_grid(req: GoalProjectionRequest):
+    """Probability of reaching a savings goal across a grid of spending cuts x deadlines."""
+    days_left = (req.deadline - date_type.today()).days
+    if days_left < 1:
+        raise HTTPException(status_code=400, detail="Deadline must be in the future")
+    if days_left > MAX_HORIZON_DAYS:
+        raise HTTPException(status_code=400, detail=f"Deadline must be within {MAX_HORIZON_DAYS} days")
+    
+    try:
+        with span("db.goal_history"):
+            income, fixed, variable = await repository.execute(
+                lambda conn: load_goal_history(conn.cursor(), req.user_id))
+        
+        with span("calc.goal_projection"):
+            data = await run_compute(
+                project_goal,
+                income, fixed, variable, req.target_amount, days_left,
+                current_savings=req.current_savings,
+                max_cut=req.max_cut,
+                cut_steps=req.cut_steps,
+                deadline_steps=req.deadline_steps,
+                paths=req.paths,
+                seed=req.seed
+            )
+        return {"success": True, "data": data}
+    except Exception as e:
+        logger.error(f"Goal projection error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to project goal")
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import AsyncIterator
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from database import get_db_connection
+from dedup import MAX_FUZZY_DAYS
+from jobs import job_queue, job_view
+from statements import MAX_STATEMENT_BYTES, StatementTooLarge
+from telemetry import registry, Gauge, span
+from routers.live import threadsafe_publisher
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+# Boundaries, part headers and the small form fields around the file.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def count_import_jobs() -> dict:
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM import_jobs GROUP BY status").fetchall()
+    return {(status,): count for status, count in rows}
+
+registry.register(Gauge("bufferzen_import_jobs", "Statement import jobs by status.", count_import_jobs, labels=("status",)))
+
+def startup() -> None:
+    job_queue.on_commit = threadsafe_publisher(asyncio.get_running_loop())
+    job_queue.start()
+
+def shutdown() -> None:
+    job_queue.stop()
+
+# --- API ENDPOINTS ---
+
+def too_large() -> StatementTooLarge:
+    return StatementTooLarge(f"Statement exceeds {MAX_STATEMENT_BYTES // (1024 * 1024)}MB limit")
+
+async def capped_body(request: Request, limit: int) -> AsyncIterator[bytes]:
+    """The request body, aborting once more than `limit` bytes have arrived."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise too_large()
+        yield chunk
+
+async def read_statement_upload(request: Request) -> UploadFile:
+    """
+    The multipart `file` field, parsed straight off the request stream. Letting FastAPI
+    bind an UploadFile would spool the whole body to a temp file before any size check;
+    here the parse stops as soon as the body passes the statement limit.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_STATEMENT_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise too_large()
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Upload the statement as multipart/form-data")
+    parser = MultiPartParser(request.headers, capped_body(request, MAX_STATEMENT_BYTES + MULTIPART_OVERHEAD_BYTES),
+                             max_files=1, max_fields=8)
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="Missing file")
+    return file
+
+@router.post("/upload-statement", status_code=202)
+async def upload_statement(
+    request: Request,
+    user_id: str = Query(..., min_length=1),
+    fuzzy_days: int = Query(0, ge=0, le=MAX_FUZZY_DAYS),
+):
+    """
+    Queue a CSV statement (multipart field `file`) for background import; poll
+    GET /jobs/{job_id} for progress. Rows already stored are skipped; `fuzzy_days`
+    also skips same amount and description posted up to that many days apart.
+    """
+    try:
+        file = await read_statement_upload(request)
+    except StatementTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        if not (file.filename or "").endswith('.csv'):
+            raise HTTPException(status_code=400, detail="Please upload CSV")
+        with span("import.enqueue"):
+            queued = await run_in_threadpool(job_queue.enqueue, file.file, file.filename, user_id, fuzzy_days)
+            job = job_view(await run_in_threadpool(job_queue.get, queued["job_id"], user_id))
+        return {"success": True, "job_id": job["id"], "deduplicated": queued["deduplicated"], "job": job}
+    except HTTPException:
+        raise
+    except StatementTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"CSV import error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    finally:
+        await file.close()
+
+@router.get("/jobs/{job_id}")
+def get_import_job(job_id: str, user_id: str = Query(..., min_length=1)):
+    job = job_queue.get(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": job_view(job)}
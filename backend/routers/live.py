@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Callable
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from events import broker, format_sse, TooManyStreams, OVERFLOW
+from telemetry import registry, Gauge, span
+from routers.budget import cached_dashboard
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+registry.register(Gauge("bufferzen_live_streams", "Open live update streams.", lambda: broker.stats()["streams"]))
+
+# --- LIVE UPDATES ---
+# Writers publish deltas to the user's open /stream connections. The dashboard is
+# computed once per write (per distinct fixed_costs among the viewers) and lands in
+# the response cache, so a viewer that still calls GET /dashboard gets a hit.
+MAX_EVENT_ROWS = 50
+
+async def publish_write(user_id: str, rows: list) -> None:
+    """Call after commit and bump_version with the new transactions as dicts."""
+    audience = broker.audience(user_id)
+    if not audience:
+        return
+    try:
+        with span("live.publish"):
+            broker.publish(user_id, "transactions", {"rows": rows[-MAX_EVENT_ROWS:], "count": len(rows)})
+            for fixed_costs in audience:
+                data = await cached_dashboard(user_id, fixed_costs)
+                broker.publish(user_id, "budget", data["budget"], fixed_costs=fixed_costs)
+            broker.publish(user_id, "analytics", data["analytics"])
+    except Exception as e:
+        logger.error(f"Live update error for {user_id}: {e}", exc_info=True)
+
+def threadsafe_publisher(loop: asyncio.AbstractEventLoop) -> Callable[[str, list], None]:
+    """publish_write for threads outside the event loop (import workers): schedules it on `loop` and returns."""
+    def publish(user_id: str, rows: list) -> None:
+        if broker.audience(user_id):
+            asyncio.run_coroutine_threadsafe(publish_write(user_id, rows), loop)
+    return publish
+
+# --- API ENDPOINTS ---
+
+@router.get("/stream")
+async def stream_updates(
+    request: Request,
+    user_id: str = Query(..., min_length=1),
+    fixed_costs: float = Query(0, ge=0, le=1000000)
+):
+    """
+    Server-Sent Events for one user's dashboard: `transactions` (new rows), `budget`
+    (metrics for this fixed_costs) and `analytics` (7-day series) after every write.
+    A stream that falls behind gets `overflow` and is closed; reconnect and reload.
+    """
+    try:
+        subscription = broker.subscribe(user_id, fixed_costs, asyncio.get_running_loop())
+    except TooManyStreams as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    async def events():
+        try:
+            yield "retry: 3000\n" + format_sse("ready", {"user_id": user_id, "fixed_costs": fixed_costs})
+            while True:
+                message = await subscription.next()
+                if message is OVERFLOW:
+                    yield format_sse("overflow", {})
+                    return
+                if message is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(*message)
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/stream/stats")
+def get_stream_stats():
+    return {"success": True, "data": broker.stats()}
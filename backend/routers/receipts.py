@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, File, UploadFile
+from ocr import ocr_pool, OCRBusy
+from telemetry import registry, Gauge
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+registry.register(Gauge("bufferzen_ocr_pending", "OCR jobs queued or running.", lambda: ocr_pool.pending))
+
+def startup() -> None:
+    ocr_pool.start()
+
+def shutdown() -> None:
+    ocr_pool.shutdown()
+
+# --- API ENDPOINTS ---
+
+MAX_RECEIPT_BYTES = 5 * 1024 * 1024
+
+@router.post("/predict-transaction")
+async def predict_from_image(file: UploadFile = File(...)):
+    allowed_types = ["image/jpeg", "image/png", "image/jpg"]
+    if file.content_type not in allowed_types:
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    
+    content = await file.read()
+    if len(content) > MAX_RECEIPT_BYTES:
+        raise HTTPException(status_code=400, detail="File too large (max 5MB)")
+    
+    try:
+        amount = await ocr_pool.recognize(content)
+        return {"success": True, "amount": amount}
+    except OCRBusy:
+        raise HTTPException(status_code=429, detail="OCR is busy, retry shortly", headers={"Retry-After": "2"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="OCR timed out")
+    except Exception as e:
+        logger.error(f"OCR error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="OCR failed")
+
+@router.get("/ocr/stats")
+def get_ocr_stats():
+    return {"success": True, "data": ocr_pool.stats()}
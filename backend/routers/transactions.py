@@ -0,0 +1,238 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, date as date_type
+from typing import Optional
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from aggregates import record_transactions
+from database import get_db_connection
+from categorizer import get_matcher, invalidate_matcher
+from cache import response_cache
+from hotstore import hot_store
+from ingest import insert_transactions, iter_ndjson, transaction_dicts, BatchTooLarge, BATCH_MAX_ITEMS
+from history import fetch_transaction_page, InvalidCursor
+from archive import iter_export, require_pyarrow, ArchiveUnavailable
+from repository import repository
+from routers.live import publish_write
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+# --- PYDANTIC MODELS ---
+class TransactionCreate(BaseModel):
+    amount: float = Field(..., gt=0)
+    type: str = Field(..., pattern="^(Income|Expense)$")
+    description: str = Field(..., min_length=1, max_length=200)
+    user_id: str = Field(..., min_length=1)
+    category: Optional[str] = None
+
+class BatchTransaction(TransactionCreate):
+    date: Optional[date_type] = None   # defaults to today, like POST /transactions
+
+class CategoryRuleCreate(BaseModel):
+    user_id: str = Field(..., min_length=1)
+    keyword: str = Field(..., min_length=1, max_length=50)
+    category: str = Field(..., min_length=1, max_length=40)
+
+# --- API ENDPOINTS ---
+
+@router.get("/transactions/recent")
+async def get_recent_transactions(user_id: str = Query(..., min_length=1)):
+    try:
+        rows = await repository.recent_transactions(user_id)
+        return {"success": True, "data": rows}
+    except Exception as e:
+        logger.error(f"Recent transactions error: {e}", exc_info=True)
+        return {"success": False, "data": []}
+
+@router.get("/transactions")
+def list_transactions(
+    user_id: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    type: Optional[str] = Query(None, pattern="^(Income|Expense)$"),
+    category: Optional[str] = None,
+    date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    q: Optional[str] = Query(None, max_length=100)
+):
+    """Pages through the hot table; rows moved to the archive tier come back via GET /export."""
+    try:
+        with get_db_connection() as conn:
+            page = fetch_transaction_page(
+                conn.cursor(), user_id, limit=limit, after=cursor, type=type, category=category,
+                date_from=date_from, date_to=date_to, min_amount=min_amount, max_amount=max_amount, search=q
+            )
+        return {"success": True, **page}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Transaction history error: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail="Failed to load transactions")
+
+EXPORT_MEDIA_TYPES = {"arrow": "application/vnd.apache.arrow.stream", "parquet": "application/vnd.apache.parquet"}
+
+@router.get("/export")
+def export_transactions(
+    user_id: str = Query(..., min_length=1),
+    format: str = Query("arrow", pattern="^(arrow|parquet)$")
+):
+    """A user's full history (archive tier plus recent rows), streamed as Arrow IPC or Parquet."""
+    try:
+        require_pyarrow()
+    except ArchiveUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return StreamingResponse(
+        iter_export(user_id, format), media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{"arrows" if format == "arrow" else "parquet"}"'}
+    )
+
+@router.post("/transactions")
+async def add_transaction(item: TransactionCreate):
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    
+    try:
+        new_row = await repository.insert_transaction(
+            date_str, item.type, item.category, item.amount, item.description, item.user_id)
+        hot_store.append(item.user_id, await response_cache.bump_version_async(item.user_id), [new_row])
+        await publish_write(item.user_id, [new_row])
+        
+        return {"success": True, "data": new_row}
+    except Exception as e:
+        logger.error(f"Insert error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to add transaction")
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+def store_transaction_batch(conn, items: list) -> tuple:
+    """Categorize and insert validated BatchTransaction items in one DB transaction; returns (ids, rows)."""
+    today = datetime.now().strftime("%Y-%m-%d")
+    cursor = conn.cursor()
+    
+    categories = [item.category for item in items]
+    by_user = defaultdict(list)
+    for pos, item in enumerate(items):
+        if not item.category:
+            by_user[item.user_id].append(pos)
+    for user_id, positions in by_user.items():
+        matched = get_matcher(cursor, user_id).match_many([items[p].description for p in positions])
+        for pos, category in zip(positions, matched):
+            categories[pos] = category
+    
+    rows = [
+        (item.date.strftime("%Y-%m-%d") if item.date else today, item.type, category,
+         item.amount, item.description, item.user_id)
+        for item, category in zip(items, categories)
+    ]
+    ids = insert_transactions(cursor, rows)
+    record_transactions(cursor, rows)
+    conn.commit()
+    return ids, rows
+
+async def publish_transaction_batch(ids: list, rows: list) -> None:
+    by_user = defaultdict(list)
+    for row in transaction_dicts(ids, rows):
+        by_user[row["user_id"]].append(row)
+    for user_id, user_rows in by_user.items():
+        hot_store.append(user_id, await response_cache.bump_version_async(user_id), user_rows)
+        await publish_write(user_id, user_rows)
+
+@router.post("/transactions/batch")
+async def add_transactions_batch(request: Request):
+    """
+    Bulk insert. Accepts a JSON array (or {"items": [...]}) of transactions, or
+    application/x-ndjson with one transaction per line. Invalid items are reported
+    by index; the valid ones are inserted together.
+    """
+    valid_indexes, valid_items, errors = [], [], []
+    
+    def validate(index, obj):
+        if isinstance(obj, Exception):
+            errors.append({"index": index, "error": str(obj)})
+            return
+        try:
+            valid_items.append(BatchTransaction.model_validate(obj))
+            valid_indexes.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "error": validation_message(e)})
+    
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            async for index, obj in iter_ndjson(request.stream()):
+                validate(index, obj)
+        else:
+            try:
+                payload = json.loads(await request.body())
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+            items = payload.get("items") if isinstance(payload, dict) else payload
+            if not isinstance(items, list):
+                raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+            if len(items) > BATCH_MAX_ITEMS:
+                raise BatchTooLarge(f"Batch exceeds {BATCH_MAX_ITEMS} items")
+            for index, obj in enumerate(items):
+                validate(index, obj)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    if not valid_items:
+        raise HTTPException(status_code=400, detail={"message": "No valid transactions", "errors": errors})
+    
+    try:
+        ids, rows = await repository.execute(lambda conn: store_transaction_batch(conn, valid_items), write=True)
+        await publish_transaction_batch(ids, rows)
+    except Exception as e:
+        logger.error(f"Batch insert error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to add transactions")
+    
+    return {
+        "success": True,
+        "inserted": len(ids),
+        "results": [{"index": index, "id": new_id} for index, new_id in zip(valid_indexes, ids)],
+        "errors": errors
+    }
+
+@router.get("/categories/rules")
+def list_category_rules(user_id: str = Query(..., min_length=1)):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM category_rules WHERE user_id = ? ORDER BY id", (user_id,))
+        return {"success": True, "data": [dict(r) for r in cursor.fetchall()]}
+
+@router.post("/categories/rules")
+async def add_category_rule(rule: CategoryRuleCreate):
+    keyword = rule.keyword.strip().lower()
+    if not keyword:
+        raise HTTPException(status_code=400, detail="Keyword cannot be blank")
+    
+    def work(conn):
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO category_rules (user_id, keyword, category) VALUES (?, ?, ?)",
+            (rule.user_id, keyword, rule.category.strip())
+        )
+        conn.commit()
+        return cursor.lastrowid
+    new_id = await repository.execute(work, write=True)
+    invalidate_matcher(rule.user_id)
+    return {"success": True, "data": {"id": new_id, "user_id": rule.user_id, "keyword": keyword, "category": rule.category.strip()}}
+
+@router.delete("/categories/rules/{rule_id}")
+async def delete_category_rule(rule_id: int, user_id: str = Query(..., min_length=1)):
+    def work(conn):
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM category_rules WHERE id = ? AND user_id = ?", (rule_id, user_id))
+        conn.commit()
+        return cursor.rowcount
+    deleted = await repository.execute(work, write=True)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    invalidate_matcher(user_id)
+    return {"success": True}
@@ -0,0 +1,314 @@
+"""
+Nightly metric snapshots for every user.
+
+    python snapshots.py                      # snapshot yesterday
+    python snapshots.py --day 2025-03-31 --backfill-days 90 --workers 4
+
+Run it nightly from cron or any scheduler. For a single-process deployment,
+SNAPSHOT_SCHEDULE=1 runs it from a background thread in the API instead; leave
+it off wherever more than one API worker runs, since each would start its own.
+
+Each snapshot stores the budget inputs that do not depend on fixed costs (window
+balance, last-30-day net, spend averages, income volatility) as of the end of its day.
+Dashboards read trends from them, and the budget endpoints take the previous 30-day
+window for momentum from the snapshot 30 days back instead of recomputing it.
+"""
+import os
+import math
+import calendar
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aggregates import EPOCH
+from calculations import budget_levels
+from database import DB_FILE, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", str(min(4, os.cpu_count() or 1))))
+SNAPSHOT_SCHEDULE = os.getenv("SNAPSHOT_SCHEDULE", "0") == "1"   # in-process scheduler, off by default
+MIN_USERS_PER_SHARD = 2000   # below this a worker process costs more than it saves
+HISTORY_DAYS = 180
+
+UPSERT_SNAPSHOT = '''
+    INSERT OR REPLACE INTO metric_snapshots
+        (user_id, day, balance, net_30, daily_avg, burn_rate, monthly_avg, income_cv, computed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+# --- GROUPED KERNEL ---
+def _grouped_first_last(groups: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    first = np.full(n, np.iinfo(np.int64).max)
+    last = np.full(n, np.iinfo(np.int64).min)
+    np.minimum.at(first, groups, values)
+    np.maximum.at(last, groups, values)
+    return first, last
+
+
+def compute_snapshots(user_ids: Sequence[str], groups: np.ndarray, days: np.ndarray, income: np.ndarray,
+                      expense: np.ndarray, income_count: np.ndarray, expense_count: np.ndarray,
+                      day: int) -> List[Tuple]:
+    """
+    Snapshot rows for many users at once. Inputs are daily buckets for days
+    (day - HISTORY_DAYS)..day, with `groups` indexing into `user_ids`. Windows match
+    calculate_metrics evaluated during `day`: the last 30 days are day-29..day.
+    """
+    n = len(user_ids)
+    if not n:
+        return []
+
+    def total(values, mask=None):
+        if mask is None:
+            return np.bincount(groups, weights=values, minlength=n)
+        return np.bincount(groups[mask], weights=values[mask], minlength=n)
+
+    expense_total = total(expense)
+    balance = total(income) - expense_total
+    recent = days >= day - 29
+    net_30 = total(income, recent) - total(expense, recent)
+
+    # Average spend over the span between first and last spending day, and weekly burn.
+    spent = expense_count > 0
+    first, last = _grouped_first_last(groups[spent], days[spent], n)
+    has_expense = last >= first
+    span = np.where(has_expense, last - first + 1, 1)
+    daily_avg = np.where(has_expense, expense_total / span, 0.0)
+
+    last_week = total(expense, days >= day - 6)
+    prev_week = total(expense, (days >= day - 13) & (days <= day - 7))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        burn_rate = np.where(has_expense & (prev_week > 0), (last_week - prev_week) / prev_week * 100, 0.0)
+
+    # Monthly income from each user's first to last income month, empty months as 0.
+    earned = income_count > 0
+    months = days[earned].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    earners = groups[earned]
+    first_month, last_month = _grouped_first_last(earners, months, n)
+    has_income = last_month >= first_month
+    n_months = np.where(has_income, last_month - first_month + 1, 0)
+    width = int(n_months.max())
+
+    monthly_avg = np.zeros(n)
+    income_cv = np.zeros(n)
+    if width:
+        slots = earners * width + (months - first_month[earners])
+        by_month = np.bincount(slots, weights=income[earned], minlength=n * width).reshape(n, width)
+        in_range = np.arange(width) < n_months[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            monthly_avg = np.where(has_income, by_month.sum(axis=1) / n_months, 0.0)
+            squares = np.where(in_range, (by_month - monthly_avg[:, None]) ** 2, 0.0).sum(axis=1)
+            stdev = np.where(n_months > 1, np.sqrt(squares / (n_months - 1)), 0.0)
+            income_cv = np.where(monthly_avg > 0, stdev / monthly_avg, 0.0)
+
+    day_str = (EPOCH + timedelta(days=int(day))).strftime("%Y-%m-%d")
+    computed_at = datetime.now().isoformat(timespec="seconds")
+    return [
+        (user_ids[i], day_str, float(balance[i]), float(net_30[i]), float(daily_avg[i]),
+         float(burn_rate[i]), float(monthly_avg[i]), float(income_cv[i]), computed_at)
+        for i in range(n)
+    ]
+
+
+def load_buckets(conn: sqlite3.Connection, day: int, lo: Optional[str] = None, hi: Optional[str] = None,
+                 missing_only: bool = False):
+    """
+    All daily buckets in the snapshot window for users in [lo, hi), as grouped columns.
+    With `missing_only`, users that already have a snapshot for `day` are left out.
+    """
+    day_str = (EPOCH + timedelta(days=day)).strftime("%Y-%m-%d")
+    where = ["day BETWEEN ? AND ?"]
+    params: list = [(EPOCH + timedelta(days=day - HISTORY_DAYS)).strftime("%Y-%m-%d"), day_str]
+    if lo is not None:
+        where.append("user_id >= ?")
+        params.append(lo)
+    if hi is not None:
+        where.append("user_id < ?")
+        params.append(hi)
+    if missing_only:
+        where.append("NOT EXISTS (SELECT 1 FROM metric_snapshots s WHERE s.user_id = daily_totals.user_id AND s.day = ?)")
+        params.append(day_str)
+
+    rows = conn.execute(
+        "SELECT user_id, day, income, expense, income_count, expense_count "
+        f"FROM daily_totals WHERE {' AND '.join(where)} ORDER BY user_id, day",
+        params
+    ).fetchall()
+    if not rows:
+        return [], *(np.zeros(0, np.int64) for _ in range(6))
+
+    # Transpose in C, then let NumPy parse the ISO dates; rows arrive grouped by user.
+    users, days, income, expense, income_count, expense_count = zip(*rows)
+    users = np.array(users, dtype=object)
+    starts = np.empty(len(users), dtype=bool)
+    starts[0] = True
+    starts[1:] = users[1:] != users[:-1]
+    return (users[starts].tolist(), np.cumsum(starts) - 1,
+            np.array(days, dtype="datetime64[D]").astype(np.int64),
+            np.array(income, dtype=np.float64), np.array(expense, dtype=np.float64),
+            np.array(income_count, dtype=np.int64), np.array(expense_count, dtype=np.int64))
+
+
+def compute_shard(db_file: str, day: int, lo: Optional[str], hi: Optional[str],
+                  missing_only: bool = False) -> List[Tuple]:
+    """Worker entry point: read one user range on a private read-only connection."""
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        user_ids, groups, days, income, expense, income_count, expense_count = load_buckets(
+            conn, day, lo, hi, missing_only)
+    finally:
+        conn.close()
+    return compute_snapshots(user_ids, groups, days, income, expense, income_count, expense_count, day)
+
+
+def shard_bounds(user_ids: List[str], shards: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Split sorted user ids into `shards` contiguous [lo, hi) ranges."""
+    size = math.ceil(len(user_ids) / shards)
+    starts = [user_ids[i] for i in range(0, len(user_ids), size)]
+    return [(lo if i else None, starts[i + 1] if i + 1 < len(starts) else None) for i, lo in enumerate(starts)]
+
+
+# --- BATCH RUN ---
+def run_snapshots(day: Optional[date] = None, workers: int = SNAPSHOT_WORKERS, db_file: str = DB_FILE,
+                  missing_only: bool = False) -> Dict:
+    """
+    Snapshot every user active in the window ending on `day` (default: yesterday).
+    `missing_only` skips users whose snapshot for `day` already exists, e.g. to redo
+    just the users a late write invalidated.
+    """
+    day = day or (date.today() - timedelta(days=1))
+    day_number = (day - EPOCH.date()).days
+    started = datetime.now()
+
+    with get_db_connection() as conn:
+        user_ids = [r[0] for r in conn.execute(
+            "SELECT DISTINCT user_id FROM daily_totals WHERE day BETWEEN ? AND ? "
+            + ("AND user_id NOT IN (SELECT user_id FROM metric_snapshots WHERE day = ?) " if missing_only else "")
+            + "ORDER BY user_id",
+            ((day - timedelta(days=HISTORY_DAYS)).isoformat(), day.isoformat())
+            + ((day.isoformat(),) if missing_only else ())
+        )]
+
+    shards = max(1, min(workers, len(user_ids) // MIN_USERS_PER_SHARD))
+    if shards == 1:
+        rows = compute_shard(db_file, day_number, None, None, missing_only)
+    else:
+        # spawn, not fork: the API process has live threads and pooled sqlite handles.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=shards, mp_context=context) as executor:
+            parts = executor.map(compute_shard, *zip(*[
+                (db_file, day_number, lo, hi, missing_only) for lo, hi in shard_bounds(user_ids, shards)]))
+            rows = [row for part in parts for row in part]
+
+    with get_db_connection() as conn:
+        conn.executemany(UPSERT_SNAPSHOT, rows)
+        conn.commit()
+
+    elapsed = (datetime.now() - started).total_seconds()
+    logger.info(f"Snapshotted {len(rows)} users for {day} in {elapsed:.2f}s ({shards} shard(s)).")
+    return {"day": day.isoformat(), "users": len(rows), "shards": shards, "elapsed_s": round(elapsed, 3)}
+
+
+# --- READS ---
+def fetch_prev_net_30(cursor, user_id: str, now: datetime) -> Optional[float]:
+    """Net of the 30-day window ending 30 days ago, if that day's snapshot exists."""
+    cursor.execute(
+        "SELECT net_30 FROM metric_snapshots WHERE user_id = ? AND day = ?",
+        (user_id, (now - timedelta(days=30)).strftime("%Y-%m-%d"))
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def fetch_trend(cursor, user_id: str, fixed_costs: float, since: str) -> List[Dict]:
+    """Daily snapshots since `since` with the fixed-cost-dependent metrics filled in."""
+    cursor.execute(
+        "SELECT * FROM metric_snapshots WHERE user_id = ? AND day >= ? ORDER BY day",
+        (user_id, since)
+    )
+    trend = []
+    for row in cursor.fetchall():
+        day = date.fromisoformat(row["day"])
+        days_in_month = calendar.monthrange(day.year, day.month)[1]
+        limit, horizon, resilience = budget_levels(row["balance"], fixed_costs, days_in_month)
+        trend.append({
+            "day": row["day"],
+            "current_balance": round(row["balance"], 2),
+            "daily_limit": round(limit, 2),
+            "survival_horizon": int(horizon),
+            "resilience_score": max(0, resilience),
+            "daily_avg": round(row["daily_avg"], 2),
+            "burn_rate": round(row["burn_rate"], 1),
+            "monthly_avg": round(row["monthly_avg"], 2),
+            "volatility_score": "High" if row["income_cv"] > 0.3 else "Low",
+        })
+    return trend
+
+
+# --- SCHEDULER ---
+class SnapshotScheduler:
+    """
+    Background thread that snapshots yesterday once per day, catching up at startup.
+    Each pass covers only the users still missing a snapshot for the day, so users
+    whose snapshot a write deleted (record_transactions) are filled back in too.
+    """
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            yesterday = date.today() - timedelta(days=1)
+            try:
+                run_snapshots(yesterday, missing_only=True)
+            except Exception as e:
+                logger.error(f"Snapshot run failed: {e}", exc_info=True)
+
+            tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+            self._stop.wait((tomorrow - datetime.now()).total_seconds() + 60)
+
+
+snapshot_scheduler = SnapshotScheduler()
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--day", type=date.fromisoformat, help="snapshot date (default: yesterday)")
+    parser.add_argument("--backfill-days", type=int, default=1, help="also snapshot this many days before --day")
+    parser.add_argument("--workers", type=int, default=SNAPSHOT_WORKERS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from database import init_db
+    init_db()
+
+    last = args.day or (date.today() - timedelta(days=1))
+    for offset in range(args.backfill_days - 1, -1, -1):
+        print(run_snapshots(last - timedelta(days=offset), args.workers))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from aggregates import EPOCH
+from archive import archived_parts, archived_through, iter_archive_batches, require_pyarrow
+from goals import FIXED_CATEGORIES
+
+# --- CONFIG ---
+ROLLING_WINDOWS = {"daily": 1, "weekly": 7, "monthly": 30}
+TREND_WINDOWS = (7, 30, 90)
+MAX_RANGE_DAYS = 1095
+MAX_TREND_WINDOW = 365
+
+
+def load_category_spend(cursor, user_id: str, date_from: str, date_to: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Expense totals grouped by (day, category) between two ISO dates, as parallel
+    columns (day number, category, amount). Days that have moved to the Parquet
+    archive are read from it, so long ranges still see the full history.
+    """
+    # One read transaction, so an archive run cannot move rows between the two tiers mid-read.
+    cursor.execute("BEGIN")
+    cursor.execute(
+        "SELECT CAST(julianday(date) - 2440587.5 AS INTEGER), category, SUM(amount) FROM transactions "
+        "WHERE user_id = ? AND type = 'Expense' AND date >= ? AND date <= ? GROUP BY date, category",
+        (user_id, date_from, date_to)
+    )
+    rows = cursor.fetchall()
+    through = archived_through(cursor, user_id)
+    parts = archived_parts(cursor, user_id) if through and through >= date_from else []
+    cursor.execute("COMMIT")
+
+    days = [np.array([r[0] for r in rows], dtype=np.int64)]
+    categories = [np.array([r[1] for r in rows], dtype=object)]
+    amounts = [np.array([r[2] for r in rows], dtype=np.float64)]
+    if parts:
+        pa = require_pyarrow()
+        import pyarrow.compute as pc
+        for batch in iter_archive_batches(parts, ("date", "type", "category", "amount"), date_from, date_to):
+            batch = batch.filter(pc.equal(batch.column("type"), "Expense"))
+            days.append(batch.column("date").cast(pa.int32()).to_numpy().astype(np.int64))
+            categories.append(batch.column("category").to_numpy(zero_copy_only=False))
+            amounts.append(batch.column("amount").to_numpy())
+    return np.concatenate(days), np.concatenate(categories), np.concatenate(amounts)
+
+
+def lead_days(trend_windows: Sequence[int] = TREND_WINDOWS) -> int:
+    """Days of history before the range start needed to fill the first day's windows."""
+    return max(max(ROLLING_WINDOWS.values()), *trend_windows) - 1
+
+
+def _trend_slopes(level: np.ndarray, moment: np.ndarray, end: int, window: int) -> np.ndarray:
+    """
+    Least-squares slope of daily spend over the `window` days ending at grid column
+    `end`, per row, from prefix sums of y and j*y (j the column index).
+    """
+    a, b = end - window + 1, end + 1
+    sum_y = level[:, b] - level[:, a]
+    sum_ty = moment[:, b] - moment[:, a] - a * sum_y       # t = j - a runs 0..window-1
+    sum_t = window * (window - 1) / 2
+    sum_tt = (window - 1) * window * (2 * window - 1) / 6
+    return (window * sum_ty - sum_t * sum_y) / (window * sum_tt - sum_t ** 2)
+
+
+def category_analytics(days: np.ndarray, categories: np.ndarray, amounts: np.ndarray,
+                       start: date, end: date, trend_windows: Sequence[int] = TREND_WINDOWS) -> Dict:
+    """
+    Per-category and fixed-vs-variable spend for each day from `start` to `end`: the
+    day's spend, trailing weekly and monthly sums, and the trend (change in daily spend
+    per day) over each trailing window ending at `end`.
+
+    The rows are scattered once into a (category, day) grid and cumulatively summed
+    along days; every rolling sum and slope is then a difference of two prefix
+    columns, so the cost is one pass over the rows plus O(categories x days) and
+    does not depend on the window lengths. The input has to reach back
+    `lead_days(trend_windows)` days before `start`.
+    """
+    lead = lead_days(trend_windows)
+    first = (start - EPOCH.date()).days - lead
+    span = (end - start).days + 1 + lead
+
+    names, index = np.unique(categories.astype(str), return_inverse=True)
+    inside = (days >= first) & (days < first + span)
+    grid = np.bincount(index[inside] * span + (days[inside] - first), weights=amounts[inside],
+                       minlength=len(names) * span).reshape(len(names), span)
+
+    fixed = np.isin(names, FIXED_CATEGORIES)
+    series = np.vstack((grid, grid[fixed].sum(axis=0), grid[~fixed].sum(axis=0)))
+    level = np.zeros((len(series), span + 1))
+    np.cumsum(series, axis=1, out=level[:, 1:])
+    moment = np.zeros((len(series), span + 1))
+    np.cumsum(series * np.arange(span), axis=1, out=moment[:, 1:])
+
+    shown = np.arange(lead, span)
+    rolling = {name: np.round(level[:, shown + 1] - level[:, shown + 1 - width], 2)
+               for name, width in ROLLING_WINDOWS.items()}
+    totals = level[:, span] - level[:, lead]
+    trends = {window: np.round(_trend_slopes(level, moment, span - 1, window), 4) for window in trend_windows}
+
+    def describe(row: int, kind: str) -> Dict:
+        return {
+            "kind": kind,
+            "total": round(float(totals[row]), 2),
+            **{name: values[row].tolist() for name, values in rolling.items()},
+            "trend": {str(window): float(slopes[row]) for window, slopes in trends.items()},
+        }
+
+    total = float(totals[-2] + totals[-1])
+    return {
+        "labels": [(start + timedelta(days=i)).isoformat() for i in range(span - lead)],
+        "categories": {str(name): describe(i, "fixed" if fixed[i] else "variable") for i, name in enumerate(names)},
+        "burn": {
+            "fixed": describe(len(names), "fixed"),
+            "variable": describe(len(names) + 1, "variable"),
+            "fixed_share": round(float(totals[-2]) / total, 4) if total > 0 else 0.0,
+        },
+        "trend_windows": list(trend_windows),
+    }
@@ -0,0 +1,135 @@
+import io
+import os
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from categorizer import CategoryMatcher, default_matcher
+from telemetry import span
+
+# pandas is imported inside the parsing functions: only CSV imports pay for loading it.
+if TYPE_CHECKING:
+    import pandas as pd
+
+# --- CONFIG ---
+MAX_STATEMENT_BYTES = int(os.getenv("MAX_STATEMENT_MB", "50")) * 1024 * 1024
+CHUNK_ROWS = 5000
+READ_BUFFER_BYTES = 64 * 1024
+
+
+class StatementTooLarge(Exception):
+    pass
+
+class StatementFormatError(Exception):
+    pass
+
+
+class CappedStream(io.RawIOBase):
+    """Read-through wrapper that aborts once more than `limit` bytes have been consumed."""
+
+    def __init__(self, raw: BinaryIO, limit: int = MAX_STATEMENT_BYTES):
+        self._raw = raw
+        self.limit = limit
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        self.bytes_read += len(data)
+        if self.bytes_read > self.limit:
+            raise StatementTooLarge(f"Statement exceeds {self.limit // (1024 * 1024)}MB limit")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def detect_columns(columns: List[str]) -> Dict[str, Optional[str]]:
+    return {
+        "date": next((c for c in columns if 'date' in c), None),
+        "amount": next((c for c in columns if any(x in c for x in ['amount', 'debit', 'credit'])), None),
+        "description": next((c for c in columns if any(x in c for x in ['description', 'narration', 'details'])), None),
+        "type": next((c for c in columns if any(x in c for x in ['type', 'cr/dr'])), None),
+    }
+
+
+def parse_chunk(df: "pd.DataFrame", cols: Dict[str, Optional[str]], user_id: str, first_row: int,
+                matcher: CategoryMatcher = default_matcher) -> Tuple[List[Tuple], List[Dict]]:
+    """
+    Clean one chunk column-wise. Returns INSERT tuples in the transactions column order
+    (date, type, category, amount, description, user_id) and the rejected rows, numbered
+    from 1 for the first data row of the file.
+    """
+    import pandas as pd
+
+    dates = pd.to_datetime(df[cols["date"]], errors="coerce", format="mixed")
+    amounts = pd.to_numeric(
+        df[cols["amount"]].astype(str).str.replace(',', '', regex=False).str.replace('₹', '', regex=False).str.strip(),
+        errors="coerce"
+    ).abs()
+
+    if cols["description"]:
+        descriptions = df[cols["description"]].astype(str).str[:200].str.replace(r'\d{10,}', '', regex=True).str.strip()
+    else:
+        descriptions = pd.Series("Imported", index=df.index)
+
+    if cols["type"]:
+        is_income = df[cols["type"]].astype(str).str.lower().str.contains('cr', regex=False)
+        types = pd.Series("Expense", index=df.index).where(~is_income, "Income")
+    else:
+        types = pd.Series("Expense", index=df.index)
+
+    bad_date = dates.isna().to_numpy()
+    bad_amount = amounts.isna().to_numpy()
+    valid = ~(bad_date | bad_amount)
+
+    rejects = [
+        {"row": first_row + int(pos), "reason": "invalid date" if bad_date[pos] else "invalid amount"}
+        for pos in (~valid).nonzero()[0]
+    ]
+
+    if not valid.any():
+        return [], rejects
+
+    descriptions = descriptions[valid]
+    rows = list(zip(
+        dates[valid].dt.strftime("%Y-%m-%d"),
+        types[valid],
+        matcher.match_series(descriptions),
+        amounts[valid].astype(float),
+        descriptions,
+        [user_id] * int(valid.sum()),
+    ))
+    return rows, rejects
+
+
+def iter_statement(raw: BinaryIO, user_id: str, matcher: CategoryMatcher = default_matcher,
+                   chunk_rows: int = CHUNK_ROWS, max_bytes: int = MAX_STATEMENT_BYTES) -> Iterator[Tuple[List[Tuple], List[Dict]]]:
+    """
+    Stream a bank CSV from a binary file object in `chunk_rows` slices.
+    Raises StatementFormatError for missing columns and StatementTooLarge past `max_bytes`.
+    """
+    import pandas as pd
+
+    stream = io.BufferedReader(CappedStream(raw, max_bytes), buffer_size=READ_BUFFER_BYTES)
+    try:
+        reader = pd.read_csv(stream, chunksize=chunk_rows, dtype=str)
+    except pd.errors.EmptyDataError:
+        raise StatementFormatError("Empty file")
+
+    cols = None
+    first_row = 1
+    with reader:
+        while True:
+            with span("csv.read_chunk"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            chunk.columns = [c.strip().lower().replace(' ', '_') for c in chunk.columns]
+            if cols is None:
+                cols = detect_columns(list(chunk.columns))
+                if not (cols["date"] and cols["amount"]):
+                    raise StatementFormatError(f"Missing columns. Found: {list(chunk.columns)}")
+
+            with span("csv.parse_chunk"):
+                parsed = parse_chunk(chunk, cols, user_id, first_row, matcher)
+            yield parsed
+            first_row += len(chunk)
@@ -0,0 +1,109 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from aggregates import fetch_daily_arrays, day_number
+
+# --- CONFIG ---
+HISTORY_DAYS = 180
+CHUNK_PATHS = 2048   # bounds the (paths x horizon) working set to a few MB per chunk
+
+
+def load_daily_history(cursor, user_id: str, history_days: int = HISTORY_DAYS) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Per-calendar-day income and expense arrays (days without activity as 0) from the
+    first active day in the window up to today, plus the window balance.
+    """
+    now = datetime.now()
+    since = (now - timedelta(days=history_days)).strftime("%Y-%m-%d")
+    daily = fetch_daily_arrays(cursor, user_id, since)
+    if not len(daily.days):
+        return np.zeros(0), np.zeros(0), 0.0
+
+    offsets = daily.days - daily.days[0]
+    span = max(int(day_number(now)) - int(daily.days[0]) + 1, 1)
+    keep = offsets < span   # ignore future-dated rows for resampling
+
+    income = np.zeros(span)
+    expense = np.zeros(span)
+    income[offsets[keep]] = daily.income[keep]
+    expense[offsets[keep]] = daily.expense[keep]
+
+    balance = float(daily.income.sum() - daily.expense.sum())
+    return income, expense, balance
+
+
+def simulate_survival(
+    daily_income: np.ndarray,
+    daily_expense: np.ndarray,
+    balance: float,
+    investments: float = 0.0,
+    paths: int = 10000,
+    horizon_days: int = 365,
+    job_loss: bool = False,
+    market_crash: float = 0.0,
+    inflation: float = 0.0,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    Bootstrap survival horizons: each simulated day replays a randomly drawn historical
+    day (its income and spend together, so lumpy freelance payments stay lumpy).
+
+    Shocks:
+      job_loss      -- no income for the whole horizon
+      market_crash  -- mean drawdown applied to investments, severity varies per path
+      inflation     -- annual rate compounding daily on spend
+    A path survives the day its cash balance first drops to zero or below.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    n_days = len(daily_expense)
+
+    income = np.zeros(n_days, dtype=np.float32) if job_loss else daily_income.astype(np.float32)
+    expense = daily_expense.astype(np.float32)
+    net_day = income - expense
+    # Extra spend from inflation on top of the historical day: expense * (scale - 1).
+    extra_scale = ((1.0 + inflation) ** (np.arange(1, horizon_days + 1) / 365.0) - 1.0).astype(np.float32)
+    index_dtype = np.int16 if n_days < np.iinfo(np.int16).max else np.int32
+
+    if market_crash > 0:
+        drawdown = np.clip(rng.normal(market_crash, market_crash / 3, size=paths), 0.0, 1.0)
+    else:
+        drawdown = np.zeros(paths)
+    start = (balance + investments * (1.0 - drawdown)).astype(np.float32)
+
+    survival = np.empty(paths, dtype=np.int32)
+    for lo in range(0, paths, CHUNK_PATHS):
+        hi = min(lo + CHUNK_PATHS, paths)
+        if n_days:
+            idx = rng.integers(0, n_days, size=(hi - lo, horizon_days), dtype=index_dtype)
+            cash = np.take(net_day, idx)
+            if inflation > 0:
+                cash -= np.take(expense, idx) * extra_scale
+        else:
+            cash = np.zeros((hi - lo, horizon_days), dtype=np.float32)
+        np.cumsum(cash, axis=1, out=cash)
+        cash += start[lo:hi, None]
+
+        broke = cash <= 0
+        first_broke = broke.argmax(axis=1)
+        ever_broke = broke[np.arange(hi - lo), first_broke]
+        survival[lo:hi] = np.where(ever_broke, first_broke, horizon_days)
+    survival[start <= 0] = 0
+
+    p5, p50, p95 = np.percentile(survival, [5, 50, 95])
+    return {
+        "paths": paths,
+        "horizon_days": horizon_days,
+        "history_days": n_days,
+        "survival_p5": int(p5),
+        "survival_p50": int(p50),
+        "survival_p95": int(p95),
+        "survival_mean": round(float(survival.mean()), 1),
+        "prob_survive_horizon": round(float((survival >= horizon_days).mean()), 4),
+        "prob_broke_30d": round(float((survival < 30).mean()), 4),
+        "prob_broke_90d": round(float((survival < 90).mean()), 4),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
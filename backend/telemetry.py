@@ -0,0 +1,268 @@
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+from collections import Counter as TallyCounter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILER_MAX_SECONDS = 300
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# --- METRICS ---
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {v}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout; one observe is a bisect and an add."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}   # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((k, list(v)) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in snapshot:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                running += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {running}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `fn`: a number, or {label values tuple: number} when labelled."""
+
+    def __init__(self, name: str, help: str, fn: Callable, labels: Sequence[str] = (), kind: str = "gauge"):
+        self.name, self.help, self.fn, self.labels, self.kind = name, help, fn, tuple(labels), kind
+
+    def collect(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} failed: {e}")
+            return []
+        values = sorted(value.items()) if self.labels else [((), value)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {float(v)}" for k, v in values]
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.collect()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "bufferzen_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+REQUEST_SECONDS = registry.register(Histogram(
+    "bufferzen_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+SPAN_SECONDS = registry.register(Histogram(
+    "bufferzen_span_duration_seconds", "Time spent in instrumented sections of request handling.", ("span",)))
+
+
+# --- SPANS ---
+class _State:
+    enabled = TELEMETRY_ENABLED
+
+state = _State()
+
+def set_enabled(enabled: bool) -> None:
+    state.enabled = enabled
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        SPAN_SECONDS.observe(time.perf_counter() - self.started, self.name)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name: str):
+    """`with span("db.daily_totals"): ...` records the block's duration; free when disabled."""
+    return _Span(name) if state.enabled else _NOOP_SPAN
+
+
+# --- HTTP MIDDLEWARE ---
+class TimingMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering). Requests are labelled
+    with the matched route template, e.g. /api/v1/jobs/{job_id}, to keep label sets small.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not state.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route)
+            REQUESTS.inc(scope["method"], route, str(status[0]))
+
+
+# --- SAMPLING PROFILER ---
+class SamplingProfiler:
+    """
+    Wall-clock sampler: a daemon thread snapshots every other thread's stack each
+    `interval` seconds via sys._current_frames(). Costs nothing until started, and
+    stops itself after `max_seconds` so a forgotten session cannot run forever.
+    Results are collapsed stacks ("outer;inner count"), the flamegraph.pl input format.
+    """
+
+    def __init__(self):
+        self._stacks: TallyCounter = TallyCounter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.interval = 0.0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, max_seconds: float = 60.0) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = TallyCounter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample, args=(interval, min(max_seconds, PROFILER_MAX_SECONDS)),
+                name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return True
+
+    def _sample(self, interval: float, max_seconds: float) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + max_seconds
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, limit: int = 50) -> Dict:
+        stacks = self._stacks.most_common()
+        leaves = TallyCounter()
+        for stack, count in stacks:
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 3),
+            "started_at": self.started_at,
+            "top_functions": [{"function": f, "samples": n} for f, n in leaves.most_common(limit)],
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks[:limit]),
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,51 @@
+import os
+import sys
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from aggregates import init_daily_totals, record_transactions   # noqa: E402
+from database import TRANSACTIONS_SCHEMA, run_migrations        # noqa: E402
+from ingest import insert_transactions                         # noqa: E402
+
+USER = "u1"
+
+
+def ago(days: int) -> str:
+    """The ISO date `days` before today."""
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def rows_for(spec, user_id: str = USER):
+    """INSERT tuples from (days ago, type, amount) triples."""
+    return [(ago(days), kind, "Misc", amount, "item", user_id) for days, kind, amount in spec]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """A fresh database file with the full schema, outside the app's pool."""
+    conn = sqlite3.connect(tmp_path / "bufferzen.db")
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(TRANSACTIONS_SCHEMA)
+    init_daily_totals(cursor)
+    run_migrations(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def store(conn):
+    """Insert (date, type, category, amount, description, user_id) rows the way the write paths do; returns their ids."""
+    def store(rows):
+        cursor = conn.cursor()
+        ids = insert_transactions(cursor, rows)
+        record_transactions(cursor, rows)
+        conn.commit()
+        return ids
+    return store
@@ -0,0 +1,60 @@
+"""Parquet archive tier: exports and the buckets of archived days."""
+import threading
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import archive   # noqa: E402
+from conftest import USER, ago, rows_for   # noqa: E402
+
+
+@pytest.fixture
+def archived(conn, store, tmp_path, monkeypatch):
+    """A user with rows in both tiers: ten archived 300+ days back, ten recent."""
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    store(rows_for([(300 + d, "Expense", 10.0 + d) for d in range(10)] + [(d, "Expense", 1.0 + d) for d in range(10)]))
+    assert archive.archive_user(conn, USER, ago(250)) == 10
+    return conn
+
+
+def test_export_survives_pages_on_different_threads(archived, tmp_path, monkeypatch):
+    import pyarrow as pa
+
+    monkeypatch.setattr(archive, "EXPORT_BATCH_ROWS", 3)
+    stream = archive.iter_export(USER, "arrow", str(tmp_path / "bufferzen.db"))
+    chunks, errors = [], []
+
+    def advance():
+        # StreamingResponse runs each next() of a sync iterator on a threadpool worker.
+        try:
+            chunks.append(next(stream))
+        except StopIteration:
+            chunks.append(None)
+        except Exception as e:
+            errors.append(e)
+            chunks.append(None)
+
+    while not chunks or chunks[-1] is not None:
+        worker = threading.Thread(target=advance)
+        worker.start()
+        worker.join()
+
+    assert not errors
+    table = pa.ipc.open_stream(b"".join(chunks[:-1])).read_all()
+    assert table.num_rows == 20
+    assert sorted(table.column("amount").to_pylist()) == sorted([10.0 + d for d in range(10)] + [1.0 + d for d in range(10)])
+
+
+def test_rebuild_keeps_archived_days(archived):
+    from aggregates import rebuild_daily_totals
+
+    def buckets():
+        return [tuple(r) for r in archived.execute("SELECT * FROM daily_totals ORDER BY user_id, day")]
+
+    before = buckets()
+    assert len(before) == 20
+    rebuild_daily_totals(archived.cursor())
+    assert buckets() == before
+    rebuild_daily_totals(archived.cursor(), USER)
+    assert buckets() == before
@@ -0,0 +1,83 @@
+"""The NumPy bucket kernel against the pandas reference over raw rows."""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from aggregates import fetch_daily_arrays
+from calculations import EMPTY_METRICS, calculate_metrics
+from conftest import USER, rows_for
+from routers.budget import calculate_metrics_from_rows
+
+FIXED_COSTS = 12000.0
+TOLERANCE = 0.01   # check_metrics_consistency's default
+
+
+def both(conn, fixed_costs=FIXED_COSTS):
+    since = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM transactions WHERE user_id = ? AND date >= ? ORDER BY date DESC", (USER, since))
+    rows = [dict(r) for r in cursor.fetchall()]
+    return calculate_metrics(fetch_daily_arrays(cursor, USER, since), fixed_costs), calculate_metrics_from_rows(rows, fixed_costs)
+
+
+def assert_consistent(aggregate, reference):
+    assert aggregate.keys() == reference.keys()
+    for key, expected in reference.items():
+        if isinstance(expected, str):
+            assert aggregate[key] == expected, key
+        else:
+            assert aggregate[key] == pytest.approx(float(expected), abs=TOLERANCE), key
+
+
+def test_empty_history(conn):
+    aggregate, reference = both(conn)
+    assert aggregate == reference == EMPTY_METRICS
+
+
+def test_single_day(conn, store):
+    store(rows_for([(0, "Income", 50000.0), (0, "Expense", 820.5), (0, "Expense", 99.5)]))
+    assert_consistent(*both(conn))
+
+
+@pytest.mark.parametrize("spec", [
+    # only expenses, no income months
+    [(3, "Expense", 400.0), (10, "Expense", 150.0)],
+    # only income
+    [(2, "Income", 30000.0), (40, "Income", 28000.0)],
+    # activity on both sides of every window edge: 7, 14, 30 and 60 days back
+    [(d, "Expense", 100.0 + d) for d in (6, 7, 8, 13, 14, 15, 29, 30, 31, 59, 60, 61)]
+    + [(d, "Income", 5000.0) for d in (30, 60)],
+    # a gap covering the whole current 30-day window
+    [(45, "Income", 40000.0), (50, "Expense", 3000.0), (90, "Expense", 1200.0)],
+    # a gap covering the previous 30-day window
+    [(5, "Income", 40000.0), (12, "Expense", 700.0), (95, "Expense", 2500.0), (120, "Income", 38000.0)],
+    # nothing in the last 60 days at all
+    [(75, "Income", 41000.0), (100, "Expense", 6000.0), (170, "Expense", 900.0)],
+    # last week's spend with none the week before (burn rate base of zero)
+    [(1, "Expense", 500.0), (2, "Expense", 250.0), (20, "Income", 60000.0)],
+])
+def test_edge_histories(conn, store, spec):
+    store(rows_for(spec))
+    assert_consistent(*both(conn))
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_synthetic_users(conn, store, seed):
+    rng = random.Random(seed)
+    active = sorted(rng.sample(range(180), rng.randint(1, 120)))
+    spec = []
+    for days in active:
+        for _ in range(rng.randint(1, 4)):
+            spec.append((days, "Expense", round(rng.uniform(10, 4000), 2)))
+        if rng.random() < 0.08:
+            spec.append((days, "Income", round(rng.uniform(15000, 90000), 2)))
+    store(rows_for(spec))
+    assert_consistent(*both(conn, fixed_costs=rng.choice([0.0, 8000.0, 25000.0])))
+
+
+def test_rows_outside_the_window_are_ignored_by_both(conn, store):
+    store(rows_for([(200, "Income", 1e6), (365, "Expense", 5e5), (3, "Expense", 120.0), (4, "Income", 9000.0)]))
+    aggregate, reference = both(conn)
+    assert_consistent(aggregate, reference)
+    assert aggregate["current_balance"] == pytest.approx(8880.0)
@@ -0,0 +1,69 @@
+"""Duplicate detection for overlapping statement imports."""
+import sqlite3
+
+import pytest
+
+from conftest import USER, ago
+from dedup import Deduplicator, normalize_description, normalized
+
+
+def row(days: int, amount: float, description: str, user_id: str = USER):
+    return (ago(days), "Expense", "Food", amount, description, user_id)
+
+
+def test_matching_is_one_to_one(conn, store):
+    store([row(3, 20.0, "Chai")])
+    incoming = [row(3, 20.0, "Chai"), row(3, 20.0, "Chai")]
+    kept, duplicates = Deduplicator(conn.cursor(), USER).filter(incoming)
+    assert duplicates == 1
+    assert kept == [incoming[1]]
+
+
+def test_rows_stored_by_the_same_import_are_claimed(conn, store):
+    dedup = Deduplicator(conn.cursor(), USER)
+    first, _ = dedup.filter([row(2, 99.0, "Swiggy")])
+    dedup.claim(store(first))
+    # The overlapping next chunk repeats the row: the copy just stored must not absorb it.
+    kept, duplicates = dedup.filter([row(2, 99.0, "Swiggy")])
+    assert (len(kept), duplicates) == (1, 0)
+
+
+def test_other_users_rows_never_match(conn, store):
+    store([row(1, 50.0, "Metro", user_id="u2")])
+    kept, duplicates = Deduplicator(conn.cursor(), USER).filter([row(1, 50.0, "Metro")])
+    assert (len(kept), duplicates) == (1, 0)
+
+
+def test_fuzzy_window_prefers_the_closest_day(conn, store):
+    far, near = store([row(10, 300.0, "Rent share"), row(7, 300.0, "Rent share")])
+    dedup = Deduplicator(conn.cursor(), USER, window_days=3)
+    kept, duplicates = dedup.filter([row(6, 300.0, "Rent share")])
+    assert (kept, duplicates) == ([], 1)
+    assert near in dedup._claimed and far not in dedup._claimed
+
+
+def test_exact_mode_ignores_shifted_dates(conn, store):
+    store([row(5, 75.0, "Cafe")])
+    kept, duplicates = Deduplicator(conn.cursor(), USER).filter([row(4, 75.0, "Cafe")])
+    assert (len(kept), duplicates) == (1, 0)
+
+
+@pytest.mark.parametrize("stored, incoming", [
+    ("UPI Swiggy", "UPI" + " " * 5 + "Swiggy"),
+    ("UPI Swiggy", "UPI" + " " * 8 + "Swiggy"),
+    ("upi swiggy", "  UPI\t\t Swiggy  "),
+])
+def test_padded_descriptions_match(conn, store, stored, incoming):
+    store([row(1, 149.0, stored)])
+    kept, duplicates = Deduplicator(conn.cursor(), USER).filter([row(1, 149.0, incoming)])
+    assert (kept, duplicates) == ([], 1)
+
+
+@pytest.mark.parametrize("text", [
+    "UPI" + " " * 5 + "Swiggy", "a" + " " * 17 + "b", " \tLead and trail\t ", "Ünï  Code",
+    "marker\x01 kept?", "", "   ",
+])
+def test_sql_and_python_normalization_agree(text):
+    sql = sqlite3.connect(":memory:").execute(f"SELECT {normalized('?')}", (text,)).fetchone()[0]
+    assert sql == normalize_description(text)
+    assert "  " not in sql
@@ -0,0 +1,53 @@
+"""History search: the FTS index is scoped per user and survives the schema migration."""
+import sqlite3
+
+from database import TRANSACTIONS_SCHEMA, run_migrations
+from history import fetch_transaction_page
+from conftest import USER, ago
+
+
+def described(descriptions, user_id=USER):
+    return [(ago(d), "Expense", "Misc", 1.0, text, user_id) for d, text in enumerate(descriptions)]
+
+
+def search(conn, user_id, text, limit=20):
+    page = fetch_transaction_page(conn.cursor(), user_id, limit=limit, search=text)
+    return [(r["user_id"], r["description"]) for r in page["data"]]
+
+
+def test_search_only_matches_the_users_rows(conn, store):
+    store(described(["Coffee shop", "Rent", "coffee beans"]))
+    store(described(["Coffee shop", "Coffee again"], user_id="u2"))
+
+    assert search(conn, USER, "coff") == [(USER, "Coffee shop"), (USER, "coffee beans")]
+    assert search(conn, "u2", "coffee shop") == [("u2", "Coffee shop")]
+    # The user id is not searchable text.
+    assert search(conn, USER, "u1") == []
+
+
+def test_user_ids_that_tokenize_alike_stay_apart(conn, store):
+    store(described(["Coffee"], user_id="a.b"))
+    store(described(["Coffee"], user_id="a-b"))
+    store(described(["Coffee"], user_id="__"))
+
+    assert search(conn, "a.b", "coffee") == [("a.b", "Coffee")]
+    assert search(conn, "a-b", "coffee") == [("a-b", "Coffee")]
+    assert search(conn, "__", "coffee") == [("__", "Coffee")]
+
+
+def test_migration_reindexes_an_existing_description_only_index(tmp_path):
+    conn = sqlite3.connect(tmp_path / "old.db")
+    conn.row_factory = sqlite3.Row
+    conn.execute(TRANSACTIONS_SCHEMA)
+    conn.execute("CREATE VIRTUAL TABLE transactions_fts USING fts5(description, content='transactions', content_rowid='id')")
+    conn.execute('''CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts (rowid, description) VALUES (new.id, new.description);
+    END''')
+    conn.executemany(
+        "INSERT INTO transactions (date, type, category, amount, description, user_id) VALUES (?, ?, ?, ?, ?, ?)",
+        described(["Coffee shop", "Rent"]))
+    conn.execute("PRAGMA user_version = 8")
+
+    run_migrations(conn)
+    assert search(conn, USER, "coffee") == [(USER, "Coffee shop")]
+    conn.close()
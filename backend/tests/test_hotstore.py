@@ -0,0 +1,100 @@
+"""Hot store coherence: held columns must always equal what daily_totals says."""
+from datetime import date, timedelta
+
+import numpy as np
+
+from aggregates import fetch_daily_arrays
+from hotstore import HotStore, daily_from_columns, day_of, load_hot_columns
+from conftest import USER, ago, rows_for
+from ingest import transaction_dicts
+
+
+def loaded_store(conn, store, spec, version=1, budget=1 << 20):
+    store(rows_for(spec))
+    hot = HotStore(budget)
+    assert hot.put(USER, version, hot.window_start(), load_hot_columns(conn.cursor(), USER, hot.window_start()))
+    return hot
+
+
+def assert_matches_db(hot, conn, version, since_days=90):
+    since = ago(since_days)
+    columns = hot.lookup(USER, version, day_of(since))
+    assert columns is not None
+    held = daily_from_columns(columns, day_of(since))
+    expected = fetch_daily_arrays(conn.cursor(), USER, since)
+    for got, want in zip(held, expected):
+        np.testing.assert_allclose(got, want)
+
+
+def write(conn, store, spec, user_id=USER):
+    rows = rows_for(spec, user_id)
+    return transaction_dicts(store(rows), rows)
+
+
+def test_load_matches_daily_totals(conn, store):
+    hot = loaded_store(conn, store, [(0, "Income", 5000.0), (0, "Expense", 20.0), (45, "Expense", 310.0), (179, "Expense", 9.0)])
+    assert_matches_db(hot, conn, 1)
+    assert_matches_db(hot, conn, 1, since_days=179)
+
+
+def test_append_after_write_keeps_the_store_exact(conn, store):
+    hot = loaded_store(conn, store, [(3, "Expense", 100.0), (10, "Income", 2000.0)])
+    hot.append(USER, 2, write(conn, store, [(0, "Expense", 45.0), (3, "Expense", 5.5)]))
+    hot.append(USER, 3, write(conn, store, [(1, "Income", 700.0)]))
+    assert_matches_db(hot, conn, 3)
+    assert hot.stats()["users"] == 1
+
+
+def test_back_dated_rows_outside_the_window_are_not_held(conn, store):
+    hot = loaded_store(conn, store, [(2, "Expense", 10.0)])
+    hot.append(USER, 2, write(conn, store, [(400, "Expense", 999.0), (1, "Expense", 1.0)]))
+    assert hot.stats()["rows"] == 2
+    assert_matches_db(hot, conn, 2)
+
+
+def test_an_unseen_write_drops_the_entry(conn, store):
+    hot = loaded_store(conn, store, [(2, "Expense", 10.0)])
+    write(conn, store, [(1, "Expense", 3.0)])           # another worker: bumped to 2, never appended here
+    hot.append(USER, 3, write(conn, store, [(0, "Expense", 4.0)]))
+    assert hot.lookup(USER, 3, day_of(ago(90))) is None
+    assert hot.stats()["users"] == 0
+
+
+def test_rows_not_above_the_held_ids_drop_the_entry(conn, store):
+    hot = loaded_store(conn, store, [(2, "Expense", 10.0), (1, "Expense", 12.0)])
+    hot.append(USER, 2, [{"id": 1, "date": ago(0), "type": "Expense", "amount": 1.0}])
+    assert hot.lookup(USER, 2, day_of(ago(90))) is None
+
+
+def test_a_stale_version_misses(conn, store):
+    hot = loaded_store(conn, store, [(2, "Expense", 10.0)])
+    assert hot.lookup(USER, 2, day_of(ago(90))) is None
+    assert hot.lookup(USER, 1, day_of(ago(400))) is None     # reaches past what is held
+
+
+def test_free_text_categories_do_not_lock_users_out(conn, store):
+    store([(ago(1), "Expense", f"Category {i}", 1.0, "x", "noisy") for i in range(300)])
+    hot = loaded_store(conn, store, [(1, "Expense", 25.0)])
+    assert hot.lookup(USER, 1, day_of(ago(90))) is not None
+
+
+def test_a_user_too_large_for_the_budget_is_refused_until_their_next_write(conn, store):
+    store(rows_for([(d % 150, "Expense", 1.0) for d in range(200)]))
+    hot = HotStore(budget_bytes=1024)
+    first = hot.window_start()
+    assert not hot.put(USER, 1, first, load_hot_columns(conn.cursor(), USER, first))
+    assert not hot.admits(USER, 1)
+    assert hot.admits(USER, 2)
+    assert hot.bytes == 0
+
+
+def test_least_recently_used_users_are_evicted(conn, store):
+    store(rows_for([(d, "Expense", 1.0) for d in range(20)], "a") + rows_for([(d, "Expense", 1.0) for d in range(20)], "b"))
+    first = date.today() - timedelta(days=180)
+    hot = HotStore(budget_bytes=2000)
+    for user_id in ("a", "b"):
+        assert hot.put(user_id, 1, first.isoformat(), load_hot_columns(conn.cursor(), user_id, first.isoformat()))
+    assert hot.stats()["users"] == 1 and hot.evictions == 1
+    assert hot.lookup("a", 1, day_of(ago(90))) is None
+    assert hot.lookup("b", 1, day_of(ago(90))) is not None
+    assert hot.bytes <= hot.budget_bytes
@@ -0,0 +1,51 @@
+"""OCR pool capacity when workers hang."""
+import asyncio
+import time
+
+import pytest
+
+from ocr import OCRBusy, OCRPool
+
+
+def hang_or_measure(content: bytes) -> float:
+    """Module-level so spawned workers can import it."""
+    if content.startswith(b"hang"):
+        time.sleep(600)
+    return float(len(content))
+
+
+@pytest.fixture
+def pool():
+    pool = OCRPool(workers=1, max_pending=2, timeout=0.5, worker_fn=hang_or_measure)
+    yield pool
+    pool.shutdown()
+
+
+def test_a_hung_worker_is_replaced_and_its_slots_released(pool):
+    async def scenario():
+        jobs = [asyncio.ensure_future(pool.recognize(b"hang %d" % i)) for i in range(2)]
+        await asyncio.sleep(0.2)
+        workers = list(pool._executor._processes.values())
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        return workers, results
+
+    workers, results = asyncio.run(scenario())
+    assert all(isinstance(r, Exception) for r in results)
+    assert pool.pending == 0 and pool.recycled >= 1
+    for worker in workers:
+        worker.join(5)
+        assert not worker.is_alive()
+    # A fresh executor takes new work.
+    assert asyncio.run(pool.recognize(b"fine")) == 4.0
+
+
+def test_the_queue_still_fills_while_jobs_run(pool):
+    async def scenario():
+        jobs = [asyncio.ensure_future(pool.recognize(b"hang %d" % i)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(OCRBusy):
+            await pool.recognize(b"hang 3")
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert pool.pending == 0
@@ -0,0 +1,41 @@
+"""Nightly snapshots: the scheduler's catch-up pass after writes invalidate some users."""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+import snapshots
+from conftest import USER, rows_for
+
+
+@pytest.fixture
+def snapshot_db(conn, store, tmp_path, monkeypatch):
+    """Two users with recent activity; run_snapshots reads and writes the fixture database."""
+    @contextmanager
+    def fixture_connection():
+        yield conn
+
+    monkeypatch.setattr(snapshots, "get_db_connection", fixture_connection)
+    store(rows_for([(d, "Income", 100.0) for d in range(2, 40)]))
+    store(rows_for([(d, "Expense", 5.0) for d in range(2, 40)], user_id="u2"))
+    return str(tmp_path / "bufferzen.db")
+
+
+def snapshot_balances(conn, day):
+    return dict(conn.execute("SELECT user_id, balance FROM metric_snapshots WHERE day = ?", (day.isoformat(),)))
+
+
+def test_missing_only_redoes_just_the_invalidated_users(conn, store, snapshot_db):
+    yesterday = date.today() - timedelta(days=1)
+    assert snapshots.run_snapshots(yesterday, workers=1, db_file=snapshot_db)["users"] == 2
+    assert snapshot_balances(conn, yesterday) == {USER: 3800.0, "u2": -190.0}
+
+    # A late write for yesterday drops that user's snapshot (record_transactions).
+    store(rows_for([(1, "Expense", 800.0)]))
+    assert snapshot_balances(conn, yesterday) == {"u2": -190.0}
+
+    result = snapshots.run_snapshots(yesterday, workers=1, db_file=snapshot_db, missing_only=True)
+    assert result["users"] == 1
+    assert snapshot_balances(conn, yesterday) == {USER: 3000.0, "u2": -190.0}
+
+    assert snapshots.run_snapshots(yesterday, workers=1, db_file=snapshot_db, missing_only=True)["users"] == 0
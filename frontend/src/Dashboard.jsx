@@ -78,18 +78,15 @@ export default function Dashboard({ user, onSignOut, currentView, onViewChange }
     const fetchData = useCallback(async () => {
         if (!user) return;
         try {
-            const budgetParams = new URLSearchParams({ user_id: user.id, fixed_costs: String(Number(anchor) || 0) });
-            const budgetRes = await fetch(`${API}/budget?${budgetParams}`);
-            const budgetJson = await budgetRes.json();
-            if (budgetJson.success) setData(budgetJson.data);
-
-            const analyticsRes = await fetch(`${API}/analytics?user_id=${user.id}`);
-            const analyticsJson = await analyticsRes.json();
-            if (analyticsJson.success) setGraphData({ labels: analyticsJson.labels || [], values: analyticsJson.values || [] });
-
-            const historyRes = await fetch(`${API}/transactions/recent?user_id=${user.id}`);
-            const historyJson = await historyRes.json();
-            if (historyJson.success) setHistory(historyJson.data || []);
+            const params = new URLSearchParams({ user_id: user.id, fixed_costs: String(Number(anchor) || 0) });
+            const res = await fetch(`${API}/dashboard?${params}`);
+            const json = await res.json();
+            if (json.success) {
+                const { budget, analytics, recent } = json.data;
+                setData(budget);
+                setGraphData({ labels: analytics.labels || [], values: analytics.values || [] });
+                setHistory(recent || []);
+            }
         } catch (err) {
             setError("Backend Offline: Ensure FastAPI is running.");
         }
@@ -97,6 +94,31 @@ export default function Dashboard({ user, onSignOut, currentView, onViewChange }
 
     useEffect(() => { fetchData(); }, [fetchData]);
 
+    // Live updates: writes from any tab or device push deltas over SSE.
+    // While the stream is open, this tab skips its own refetch after a write.
+    const [live, setLive] = useState(false);
+    useEffect(() => {
+        if (!user) return;
+        const params = new URLSearchParams({ user_id: user.id, fixed_costs: String(Number(anchor) || 0) });
+        const source = new EventSource(`${API}/stream?${params}`);
+        const on = (event, handler) => source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+        // After a reconnect (network drop, or `overflow` when this tab fell behind) reload once to resync.
+        let connected = false;
+        on('ready', () => {
+            if (connected) fetchData();
+            connected = true;
+            setLive(true);
+        });
+        on('transactions', ({ rows }) => setHistory(prev =>
+            [...rows, ...prev]
+                .sort((a, b) => (b.date.localeCompare(a.date)) || (b.id - a.id))
+                .slice(0, 10)));
+        on('budget', setData);
+        on('analytics', (analytics) => setGraphData({ labels: analytics.labels || [], values: analytics.values || [] }));
+        source.onerror = () => setLive(false);
+        return () => { source.close(); setLive(false); };
+    }, [user, anchor, fetchData]);
+
     const handleManualLog = async () => {
         setLoading(true);
         try {
@@ -107,7 +129,7 @@ export default function Dashboard({ user, onSignOut, currentView, onViewChange }
             });
             if (res.ok) {
                 setForm({ amount: '', description: '', type: 'Expense', is_fixed: false });
-                fetchData();
+                if (!live) fetchData();
             }
         } finally { setLoading(false); }
     };
@@ -120,11 +142,22 @@ export default function Dashboard({ user, onSignOut, currentView, onViewChange }
         setLoading(true);
         try {
             const res = await fetch(`${API}/upload-statement?user_id=${user.id}`, { method: 'POST', body: formData });
-            if (res.ok) {
-                setUploadSuccess("Imported Successfully");
-                fetchData();
-                setTimeout(() => setUploadSuccess(null), 3000);
-            }
+            if (!res.ok) return;
+            const { job_id } = await res.json();
+            // Import runs in the background; poll until the job settles.
+            let job;
+            do {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const poll = await fetch(`${API}/jobs/${job_id}?user_id=${user.id}`);
+                job = (await poll.json()).data;
+                setUploadSuccess(`Importing... ${job.progress_pct}%`);
+            } while (job.status === 'queued' || job.status === 'running');
+            setUploadSuccess(job.status === 'done'
+                ? `Imported ${job.rows_inserted} transactions${job.rows_duplicate ? `, skipped ${job.rows_duplicate} duplicates` : ''}`
+                : null);
+            if (job.status === 'failed') setError(job.error);
+            if (!live) fetchData();
+            setTimeout(() => setUploadSuccess(null), 3000);
         } finally { setLoading(false); }
     };
 
@@ -270,6 +303,11 @@ export default function Dashboard({ user, onSignOut, currentView, onViewChange }
                     </div>
                 </div>
 
+                {/* GOAL PROJECTION */}
+                <div className="mb-6">
+                    <GoalSetter currentDailyLimit={data.daily_limit} userId={user?.id} />
+                </div>
+
                 {/* ZONE 4: LIVE HISTORY & BULK UPLOAD */}
                 <HistoryList history={history} onUpload={handleBulkUpload} loading={loading} />
             </div>
@@ -2,7 +2,9 @@ import { useState, useEffect } from 'react';
 import { Target, Calendar, Calculator, PartyPopper } from 'lucide-react';
 import { motion } from 'framer-motion';
 
-export default function GoalSetter({ currentDailyLimit }) {
+const API = "/api/v1";
+
+export default function GoalSetter({ currentDailyLimit, userId }) {
     const [goal, setGoal] = useState(() => {
         const saved = localStorage.getItem('buffer_goal');
         return saved ? JSON.parse(saved) : { name: '', cost: '', date: '' };
@@ -29,6 +31,28 @@ export default function GoalSetter({ currentDailyLimit }) {
 
     const impact = calculateImpact();
 
+    // Probability heatmap (spending cut x deadline) from the backend projection.
+    const [projection, setProjection] = useState(null);
+    useEffect(() => {
+        if (!userId || !goal.cost || !goal.date) { setProjection(null); return; }
+        const controller = new AbortController();
+        const timer = setTimeout(async () => {
+            try {
+                const res = await fetch(`${API}/goals/project`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ user_id: userId, target_amount: Number(goal.cost), deadline: goal.date, cut_steps: 20, deadline_steps: 30 }),
+                    signal: controller.signal,
+                });
+                const json = await res.json();
+                setProjection(json.success ? json.data : null);
+            } catch (err) {
+                if (err.name !== 'AbortError') setProjection(null);
+            }
+        }, 250);
+        return () => { clearTimeout(timer); controller.abort(); };
+    }, [userId, goal.cost, goal.date]);
+
     return (
         <div className="bg-stone-900/40 p-6 rounded-[2rem] border border-stone-800 relative overflow-hidden">
             <div className="absolute top-0 right-0 p-4 opacity-5">
@@ -74,6 +98,26 @@ export default function GoalSetter({ currentDailyLimit }) {
                                 <p className="text-[10px] text-purple-400 font-bold uppercase">Save Daily</p>
                                 <p className="text-2xl font-black text-white">₹{impact.dailySave.toLocaleString()}</p>
                             </div>
+                            {projection && (
+                                <div className="pt-2">
+                                    <p className="text-[9px] uppercase tracking-widest text-stone-500 mb-1">
+                                        {Math.round(projection.requested.probability_no_cut * 100)}% on track without cuts
+                                        {projection.requested.cut_for_target_probability !== null &&
+                                            ` · cut ${Math.round(projection.requested.cut_for_target_probability * 100)}% for ${projection.requested.target_probability * 100}%`}
+                                    </p>
+                                    <div className="grid gap-px" style={{ gridTemplateColumns: `repeat(${projection.deadline_days.length}, 1fr)` }}>
+                                        {[...projection.probability].reverse().map((row, i) => row.map((p, j) => (
+                                            <div
+                                                key={`${i}-${j}`}
+                                                className="h-1.5 bg-purple-400"
+                                                style={{ opacity: 0.08 + 0.92 * p }}
+                                                title={`${Math.round(projection.cuts[projection.cuts.length - 1 - i] * 100)}% cut, ${projection.deadline_days[j]} days: ${Math.round(p * 100)}%`}
+                                            />
+                                        )))}
+                                    </div>
+                                    <p className="text-[8px] text-stone-600 mt-1">Spending cut (up) vs days (right)</p>
+                                </div>
+                            )}
                             {currentDailyLimit > 0 && (
                                 <p className="text-[9px] text-stone-500">
                                     New Safe-to-Spend: <span className={impact.newDailyLimit < 500 ? "text-red-400" : "text-emerald-400"}>₹{impact.newDailyLimit.toLocaleString()}</span>